@@ -0,0 +1,110 @@
+# asr_benchmark.py
+#
+# Reports real-time factor (decode time / audio duration) and word error rate
+# for each ASR backend, model size and decoding profile on a directory of
+# fixture recordings.
+# Each fixture is a WAV file with a plain-text reference transcript next to it
+# (e.g. greeting.wav + greeting.txt).
+#
+# Run from the repository root:
+#   python -m benchmarks.asr_benchmark --fixtures benchmarks/fixtures
+
+import argparse
+import glob
+import os
+import re
+import sys
+import time
+
+import whisper
+
+from managers.asrbackends import ASR_BACKENDS, DECODING_PROFILES, MODEL_SIZES, create_backend, get_decode_options
+
+SAMPLE_RATE = 16000
+
+def normalize_words(text):
+    """Lower-cases and strips punctuation so WER only counts word differences."""
+    return re.sub(r"[^\w\s']", ' ', text.lower()).split()
+
+def word_error_rate(reference, hypothesis):
+    """Returns (edit distance, reference word count) between two transcripts."""
+    ref = normalize_words(reference)
+    hyp = normalize_words(hypothesis)
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, hyp_word in enumerate(hyp, 1):
+            current[j] = min(
+                previous[j] + 1,  # Deletion
+                current[j - 1] + 1,  # Insertion
+                previous[j - 1] + (ref_word != hyp_word)  # Substitution
+            )
+        previous = current
+    return previous[-1], len(ref)
+
+def load_fixtures(directory):
+    """Loads (name, audio, reference) triples for every WAV with a matching .txt file."""
+    fixtures = []
+    for wav_path in sorted(glob.glob(os.path.join(directory, '*.wav'))):
+        txt_path = os.path.splitext(wav_path)[0] + '.txt'
+        if not os.path.exists(txt_path):
+            print(f"Skipping {wav_path}: no reference transcript")
+            continue
+        with open(txt_path, 'r', encoding='utf-8') as f:
+            reference = f.read().strip()
+        fixtures.append((os.path.basename(wav_path), whisper.load_audio(wav_path, sr=SAMPLE_RATE), reference))
+    return fixtures
+
+def load_backend(backend_name, model_size, fixtures):
+    """Loads and warms up one backend, returning it with its load time."""
+    backend = create_backend(backend_name, model_size)
+    start_time = time.perf_counter()
+    backend.load()
+    load_time = time.perf_counter() - start_time
+    backend.transcribe(fixtures[0][1][:SAMPLE_RATE], temperature=0.0)  # Warm-up
+    return backend, load_time
+
+def benchmark_backend(backend, fixtures, decode_options):
+    """Returns (RTF, WER) of a loaded backend over all fixtures."""
+    decode_time = 0.0
+    audio_time = 0.0
+    errors = 0
+    words = 0
+    for name, audio, reference in fixtures:
+        start_time = time.perf_counter()
+        text = backend.transcribe(audio, **decode_options)
+        decode_time += time.perf_counter() - start_time
+        audio_time += len(audio) / SAMPLE_RATE
+        distance, count = word_error_rate(reference, text)
+        errors += distance
+        words += count
+    return decode_time / audio_time, errors / max(words, 1)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ASR backends on fixture recordings.")
+    parser.add_argument('--fixtures', default=os.path.join(os.path.dirname(__file__), 'fixtures'),
+                        help="Directory of WAV files with matching .txt reference transcripts")
+    parser.add_argument('--backends', nargs='+', default=list(ASR_BACKENDS), choices=list(ASR_BACKENDS))
+    parser.add_argument('--models', nargs='+', default=MODEL_SIZES, choices=MODEL_SIZES)
+    parser.add_argument('--profiles', nargs='+', default=['balanced'], choices=list(DECODING_PROFILES))
+    parser.add_argument('--language', default='en-US', help="Locale used by profiles that pin the language")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixtures)
+    if not fixtures:
+        print(f"No fixtures found in {args.fixtures}")
+        sys.exit(1)
+    total_audio = sum(len(audio) for _, audio, _ in fixtures) / SAMPLE_RATE
+    print(f"{len(fixtures)} fixtures, {total_audio:.1f}s of audio")
+
+    print(f"{'backend':<14} {'model':<6} {'profile':<9} {'load (s)':>9} {'RTF':>7} {'WER':>7}")
+    for backend_name in args.backends:
+        for model_size in args.models:
+            backend, load_time = load_backend(backend_name, model_size, fixtures)
+            for profile in args.profiles:
+                rtf, wer = benchmark_backend(backend, fixtures, get_decode_options(profile, args.language))
+                print(f"{backend_name:<14} {model_size:<6} {profile:<9} {load_time:>9.2f} {rtf:>7.3f} {wer:>7.1%}")
+                sys.stdout.flush()
+
+if __name__ == "__main__":
+    main()
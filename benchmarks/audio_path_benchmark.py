@@ -0,0 +1,81 @@
+# audio_path_benchmark.py
+#
+# Compares per-utterance memory and time of the old capture-to-Whisper audio
+# path (per-frame bytes, b''.join, np.frombuffer, astype, divide) with the
+# ring-view path (block-aligned views, one int16 -> float32 conversion into a
+# reused scratch buffer). No sound device is opened; the capture callback is
+# fed synthetic blocks.
+#
+# Run from the repository root:
+#   python -m benchmarks.audio_path_benchmark
+
+import argparse
+import time
+import tracemalloc
+import types
+
+import numpy as np
+
+from managers.capturestream import CaptureStream
+
+SAMPLE_RATE = 16000
+FRAME_SIZE = 480  # 30 ms
+
+def fill_stream(stream, seconds):
+    """Pushes synthetic noise through the capture callback."""
+    status = types.SimpleNamespace(input_overflow=False)
+    rng = np.random.default_rng(0)
+    for _ in range(int(seconds * SAMPLE_RATE / FRAME_SIZE)):
+        block = rng.integers(-3000, 3000, size=(FRAME_SIZE, 1), dtype=np.int16)
+        stream._callback(block, FRAME_SIZE, None, status)
+
+def old_path(stream, start, end):
+    """Mimics the original loop: copy each frame out, keep its bytes, then join and convert."""
+    voiced_frames = []
+    for position in range(start, end, FRAME_SIZE):
+        data = stream.get_range(position, position + FRAME_SIZE)
+        voiced_frames.append(data.tobytes())
+    audio_data = b''.join(voiced_frames)
+    return np.frombuffer(audio_data, dtype='int16').astype(np.float32) / 32768.0
+
+def new_path(stream, start, end, scratch):
+    """Reads frames as ring views and converts the segment once into the scratch buffer."""
+    for position in range(start, end, FRAME_SIZE):
+        stream.read(position, FRAME_SIZE, timeout=0)
+    return stream.to_float32(start, end, scratch)
+
+def measure(label, func, runs):
+    """Reports mean time and peak traced memory per call."""
+    func()  # Warm-up
+    tracemalloc.start()
+    peak = 0
+    start_time = time.perf_counter()
+    for _ in range(runs):
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        result = func()
+        peak = max(peak, tracemalloc.get_traced_memory()[1] - baseline)
+        del result
+    elapsed = (time.perf_counter() - start_time) / runs
+    tracemalloc.stop()
+    print(f"{label:<10} {elapsed * 1000:>9.3f} ms {peak / 1024:>10.1f} KiB peak")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the capture-to-Whisper audio path.")
+    parser.add_argument('--seconds', type=float, default=10.0, help="Utterance length")
+    parser.add_argument('--runs', type=int, default=50)
+    args = parser.parse_args()
+
+    stream = CaptureStream(sample_rate=SAMPLE_RATE)
+    fill_stream(stream, args.seconds + 1)
+    start = FRAME_SIZE * 10
+    end = start + int(args.seconds * SAMPLE_RATE) // FRAME_SIZE * FRAME_SIZE
+    scratch = np.empty(end - start, dtype=np.float32)
+
+    assert np.array_equal(old_path(stream, start, end), new_path(stream, start, end, scratch))
+    print(f"{args.seconds:.1f}s utterance, {(end - start) // FRAME_SIZE} frames, {args.runs} runs")
+    measure('old path', lambda: old_path(stream, start, end), args.runs)
+    measure('ring view', lambda: new_path(stream, start, end, scratch), args.runs)
+
+if __name__ == "__main__":
+    main()
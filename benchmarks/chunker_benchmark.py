@@ -0,0 +1,99 @@
+# chunker_benchmark.py
+#
+# Compares the old chatbox text splitter (regex compiled per call, chunks built
+# by string concatenation, complete text required) with the incremental
+# TextChunker on multi-kilobyte inputs. Reports total split time, time until
+# the first chunk is available and the time to feed the same text in small
+# pieces, as it would arrive from a stream.
+#
+# Run from the repository root:
+#   python -m benchmarks.chunker_benchmark
+
+import argparse
+import random
+import re
+import time
+
+from managers.textchunker import TextChunker, split_text
+
+MAX_LENGTH = 144
+
+def legacy_split_text(text, max_length):
+    """The splitter ApplicationController used before TextChunker, kept for comparison."""
+    sentence_endings = re.compile(r'(?<=[.!?])\s+')
+    sentences = sentence_endings.split(text)
+    chunks = []
+    current_chunk = ''
+    for sentence in sentences:
+        if len(current_chunk) + len(sentence) + 1 <= max_length:
+            current_chunk += (' ' + sentence) if current_chunk else sentence
+        else:
+            if current_chunk:
+                chunks.append(current_chunk.strip())
+            if len(sentence) <= max_length:
+                current_chunk = sentence
+            else:
+                words = sentence.split()
+                current_sentence_chunk = ''
+                for word in words:
+                    if len(current_sentence_chunk) + len(word) + 1 <= max_length:
+                        current_sentence_chunk += (' ' + word) if current_sentence_chunk else word
+                    else:
+                        chunks.append(current_sentence_chunk.strip())
+                        current_sentence_chunk = word
+                current_chunk = current_sentence_chunk
+    if current_chunk:
+        chunks.append(current_chunk.strip())
+    return chunks
+
+def make_text(size, seed=0):
+    """Random prose of about `size` characters with sentences of varying length."""
+    rng = random.Random(seed)
+    words = "the quick brown fox jumps over a lazy dog while we wait for the next world to load".split()
+    parts = []
+    length = 0
+    while length < size:
+        sentence = ' '.join(rng.choice(words) for _ in range(rng.randint(3, 40)))
+        sentence = sentence.capitalize() + rng.choice('.!?')
+        parts.append(sentence)
+        length += len(sentence) + 1
+    return ' '.join(parts)[:size]
+
+def best_of(repeats, function):
+    """Returns the fastest of `repeats` runs of function(), in seconds."""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def feed_in_pieces(text, piece):
+    chunker = TextChunker(MAX_LENGTH)
+    chunks = []
+    for start in range(0, len(text), piece):
+        chunks.extend(chunker.feed(text[start:start + piece]))
+    chunks.extend(chunker.close())
+    return chunks
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the chatbox text chunker.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1024, 4096, 16384, 65536], help="Input sizes in characters")
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument('--piece', type=int, default=16, help="Characters per feed() call in the incremental run")
+    args = parser.parse_args()
+
+    print(f"{'size':>8} {'chunks':>7} {'legacy':>10} {'chunker':>10} {'first':>10} {'fed':>10}")
+    for size in args.sizes:
+        text = make_text(size)
+        chunks = list(split_text(text, MAX_LENGTH))
+        assert feed_in_pieces(text, args.piece) == chunks
+        legacy = best_of(args.repeats, lambda: legacy_split_text(text, MAX_LENGTH))
+        chunker = best_of(args.repeats, lambda: list(split_text(text, MAX_LENGTH)))
+        first = best_of(args.repeats, lambda: next(split_text(text, MAX_LENGTH)))
+        fed = best_of(args.repeats, lambda: feed_in_pieces(text, args.piece))
+        print(f"{size:>8} {len(chunks):>7} {legacy * 1e6:>8.0f}us {chunker * 1e6:>8.0f}us "
+              f"{first * 1e6:>8.1f}us {fed * 1e6:>8.0f}us")
+
+if __name__ == "__main__":
+    main()
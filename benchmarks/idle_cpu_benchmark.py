@@ -0,0 +1,70 @@
+# idle_cpu_benchmark.py
+#
+# Estimates the CPU cost of leaving VisVoice running idle:
+#   * capture off: the old 100 ms polling loop vs. blocking on an Event
+#   * capture on in a quiet room: webrtcvad on every frame vs. behind the
+#     adaptive EnergyGate
+# No sound device is opened; frames are synthetic background noise.
+#
+# Run from the repository root:
+#   python -m benchmarks.idle_cpu_benchmark
+
+import argparse
+import threading
+import time
+
+import numpy as np
+
+from managers.vad import EnergyGate, VadSegmenter
+
+SAMPLE_RATE = 16000
+FRAME_SIZE = 480  # 30 ms
+
+def cpu_seconds(func):
+    start = time.process_time()
+    func()
+    return time.process_time() - start
+
+def polling_loop(seconds):
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        time.sleep(0.1)
+
+def event_loop(seconds):
+    threading.Event().wait(seconds)
+
+def quiet_frames(seconds, level_db):
+    """Generates white noise frames at roughly `level_db` dBFS."""
+    rng = np.random.default_rng(0)
+    amplitude = 32768.0 * 10 ** (level_db / 20)
+    count = int(seconds * SAMPLE_RATE / FRAME_SIZE)
+    noise = rng.normal(0.0, amplitude, size=(count, FRAME_SIZE))
+    return np.clip(noise, -32768, 32767).astype(np.int16)
+
+def run_segmenter(segmenter, frames):
+    for frame in frames:
+        segmenter.feed(frame)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark idle CPU usage of the voice loop.")
+    parser.add_argument('--idle-seconds', type=float, default=3.0, help="Wall time for the capture-off loops")
+    parser.add_argument('--audio-seconds', type=float, default=300.0, help="Quiet audio fed to the VAD")
+    parser.add_argument('--level', type=float, default=-55.0, help="Background noise level in dBFS")
+    args = parser.parse_args()
+
+    print(f"Capture off, {args.idle_seconds:.0f}s wall time:")
+    for label, loop in (('polling', polling_loop), ('event wait', event_loop)):
+        used = cpu_seconds(lambda: loop(args.idle_seconds))
+        print(f"  {label:<12} {used * 1000:8.2f} ms CPU ({used / args.idle_seconds:.4%} of a core)")
+
+    frames = quiet_frames(args.audio_seconds, args.level)
+    print(f"Capture on, {args.audio_seconds:.0f}s of {args.level:.0f} dBFS noise:")
+    ungated = VadSegmenter(sample_rate=SAMPLE_RATE)
+    gated = VadSegmenter(sample_rate=SAMPLE_RATE, gate=EnergyGate())
+    for label, segmenter in (('webrtcvad', ungated), ('energy gate', gated)):
+        used = cpu_seconds(lambda: run_segmenter(segmenter, frames))
+        print(f"  {label:<12} {used * 1000:8.2f} ms CPU ({used / args.audio_seconds:.4%} of a core)")
+    print(f"  gate passed {gated.gate.pass_ratio():.1%} of frames to webrtcvad")
+
+if __name__ == "__main__":
+    main()
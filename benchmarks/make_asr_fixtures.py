@@ -0,0 +1,98 @@
+# make_asr_fixtures.py
+#
+# Regenerates the speech fixtures in benchmarks/fixtures used by
+# asr_benchmark.py: a few short sentences spoken by different espeak-ng
+# voices, stored as 16 kHz mono 16-bit WAV files next to their reference
+# transcripts. espeak-ng runs offline and gives the same audio on every run,
+# so the fixtures can be rebuilt exactly; it only needs the bundled library
+# from the espeakng-loader package (pip install espeakng-loader). The
+# committed fixtures make this unnecessary unless the set is changed.
+#
+# Run from the repository root:
+#   python -m benchmarks.make_asr_fixtures
+
+import argparse
+import ctypes
+import os
+
+import espeakng_loader
+import numpy as np
+import soundfile as sf
+
+from managers.resampler import resample
+
+SAMPLE_RATE = 16000
+
+AUDIO_OUTPUT_SYNCHRONOUS = 2
+POS_CHARACTER = 1
+ESPEAK_CHARS_UTF8 = 1
+ESPEAK_RATE = 1
+
+SYNTH_CALLBACK = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.POINTER(ctypes.c_short), ctypes.c_int, ctypes.c_void_p)
+
+# name -> (voice, words per minute, transcript); no digits, so WER does not depend on number formatting
+FIXTURES = {
+    'greeting': ('en-us+f3', 165, "Hey everyone, welcome to the world. Can you all hear me okay?"),
+    'directions': ('en+m3', 155, "Follow the path past the fountain and take the second portal on the left."),
+    'question': ('en-us+f2', 170, "Does anyone know how to change the avatar scale in the quick menu?"),
+    'farewell': ('en-gb-x-rp+m1', 160, "Thanks for hanging out tonight, I have to log off now but I will see you tomorrow."),
+}
+
+class Espeak:
+    """Minimal ctypes binding to synchronous espeak-ng synthesis."""
+
+    def __init__(self):
+        self.lib = ctypes.CDLL(espeakng_loader.get_library_path())
+        self.lib.espeak_Initialize.restype = ctypes.c_int
+        self.lib.espeak_Initialize.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_char_p, ctypes.c_int]
+        self.lib.espeak_Synth.argtypes = [
+            ctypes.c_void_p, ctypes.c_size_t, ctypes.c_uint, ctypes.c_int, ctypes.c_uint,
+            ctypes.c_uint, ctypes.c_void_p, ctypes.c_void_p,
+        ]
+        self.lib.espeak_SetVoiceByName.argtypes = [ctypes.c_char_p]
+        self.lib.espeak_SetParameter.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_int]
+        self.samplerate = self.lib.espeak_Initialize(
+            AUDIO_OUTPUT_SYNCHRONOUS, 0, espeakng_loader.get_data_path().encode(), 0
+        )
+        if self.samplerate <= 0:
+            raise RuntimeError("espeak-ng failed to initialize")
+        self.samples = []
+        # Keep a reference to the callback so it is not collected while espeak-ng holds it
+        self.callback = SYNTH_CALLBACK(self.on_samples)
+        self.lib.espeak_SetSynthCallback(self.callback)
+
+    def on_samples(self, wav, count, events):
+        if count > 0:
+            self.samples.append(np.ctypeslib.as_array(wav, shape=(count,)).copy())
+        return 0
+
+    def synthesize(self, voice, rate, text):
+        """Returns the text spoken by voice at rate words per minute as float32 samples."""
+        if self.lib.espeak_SetVoiceByName(voice.encode()) != 0:
+            raise RuntimeError(f"espeak-ng voice {voice} is not available")
+        self.lib.espeak_SetParameter(ESPEAK_RATE, rate, 0)
+        self.samples = []
+        data = text.encode('utf-8') + b'\0'
+        buffer = ctypes.create_string_buffer(data)
+        self.lib.espeak_Synth(buffer, len(data), 0, POS_CHARACTER, 0, ESPEAK_CHARS_UTF8, None, None)
+        self.lib.espeak_Synchronize()
+        audio = np.concatenate(self.samples).astype(np.float32) / 32768.0
+        return resample(audio, self.samplerate, SAMPLE_RATE)
+
+def main():
+    parser = argparse.ArgumentParser(description="Regenerate the ASR benchmark fixtures with espeak-ng.")
+    parser.add_argument('--output', default=os.path.join(os.path.dirname(__file__), 'fixtures'))
+    args = parser.parse_args()
+
+    espeak = Espeak()
+    os.makedirs(args.output, exist_ok=True)
+    for name, (voice, rate, text) in FIXTURES.items():
+        audio = espeak.synthesize(voice, rate, text)
+        pcm = np.clip(audio * 32768.0, -32768, 32767).astype(np.int16)
+        sf.write(os.path.join(args.output, f"{name}.wav"), pcm, SAMPLE_RATE, subtype='PCM_16')
+        with open(os.path.join(args.output, f"{name}.txt"), 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+        print(f"{name}: {len(pcm) / SAMPLE_RATE:.1f}s ({voice})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# output_pipeline_benchmark.py
+#
+# Drives the TTS output path (dispatcher, synthesis look-ahead, resampling,
+# persistent output stream) with the deterministic fake tone engine, so it runs
+# without network access or installed voices. The text goes through the
+# OutputDispatcher as one message, exactly as typed text does, with chatbox
+# output off. Audio is played on the default (or given) output device.
+#
+# Reports time to first audio, total time against total audio duration (the
+# difference is the gap between chunks) and the player's underrun counters.
+#
+# Run from the repository root:
+#   python -m benchmarks.output_pipeline_benchmark --engine fake-tone-stream
+
+import argparse
+import threading
+import time
+
+from managers.chatboxpacer import ChatboxPacer
+from managers.outputdispatcher import OutputDispatcher
+from managers.outputmanager import OutputManager
+from managers.ttsengines import TTS_ENGINES, FakeToneEngine
+
+def make_chunks(count, length):
+    words = "the quick brown fox jumps over a lazy dog while we wait".split()
+    chunks = []
+    for i in range(count):
+        text = ''
+        j = i
+        while len(text) < length:
+            text += words[j % len(words)] + ' '
+            j += 1
+        chunks.append(text[:length].strip())
+    return chunks
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the TTS output pipeline offline.")
+    parser.add_argument('--engine', default='fake-tone', choices=[name for name in TTS_ENGINES if name.startswith('fake')])
+    parser.add_argument('--chunks', type=int, default=5, help="Number of chunks to speak")
+    parser.add_argument('--length', type=int, default=60, help="Characters per chunk")
+    parser.add_argument('--lookahead', type=int, default=2)
+    parser.add_argument('--realtime-factor', type=float, default=0.0,
+                        help="Synthesis time per second of audio for fake-tone-stream (0: instant)")
+    parser.add_argument('--device', type=int, help="Output device index (default: system default)")
+    args = parser.parse_args()
+
+    output_manager = OutputManager(
+        chatbox_port=9,  # Discard port; nothing listens
+        voice_engine=args.engine,
+        voice='tone',
+        cache_disk_mb=0,
+        lookahead=args.lookahead,
+        output_device=args.device
+    )
+    output_manager.engine.realtime_factor = args.realtime_factor
+    chunks = make_chunks(args.chunks, args.length)
+    audio_seconds = sum(max(0.1, len(chunk) * FakeToneEngine.seconds_per_char) for chunk in chunks)
+
+    done_events = []
+    handed_off = threading.Condition()
+
+    def speak(chunk):
+        done = output_manager.speak_text(chunk)
+        with handed_off:
+            done_events.append(done)
+            handed_off.notify()
+        return done
+
+    dispatcher = OutputDispatcher(
+        speak=speak,
+        show=lambda chunk: None,
+        cancel_output=output_manager.clear_speech,
+        pacer=ChatboxPacer(chatbox_enabled=lambda: False),
+        lookahead=args.lookahead
+    )
+
+    start_time = time.perf_counter()
+    dispatcher.submit(chunks)
+    first_done = None
+    for i in range(len(chunks)):
+        with handed_off:
+            handed_off.wait_for(lambda: len(done_events) > i)
+        done_events[i].wait()
+        if first_done is None:
+            first_done = time.perf_counter() - start_time
+    total = time.perf_counter() - start_time
+    first_audio = first_done - max(0.1, len(chunks[0]) * FakeToneEngine.seconds_per_char)
+
+    print(f"{len(chunks)} chunks, {audio_seconds:.2f}s of audio via {args.engine}")
+    print(f"  time to first audio  {first_audio * 1000:8.1f} ms")
+    print(f"  total                {total:8.2f} s")
+    print(f"  gaps and overhead    {(total - audio_seconds) * 1000:8.1f} ms")
+    for device, stats in output_manager.get_playback_stats().items():
+        print(f"  device {device}: {stats}")
+    dispatcher.stop()
+    output_manager.close()
+
+if __name__ == "__main__":
+    main()
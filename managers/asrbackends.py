@@ -0,0 +1,148 @@
+# asrbackends.py
+
+import warnings
+warnings.filterwarnings("ignore", category=UserWarning)
+warnings.filterwarnings("ignore", category=FutureWarning)
+
+import copy
+import logging
+import os
+import sys
+import whisper  # This imports the correct 'whisper' module from 'openai-whisper'
+import torch
+
+MODEL_SIZES = ['tiny', 'base', 'small']
+
+# Named trade-offs between decode latency and robustness. `pin_language` skips
+# Whisper's per-utterance language detection pass by using the configured language;
+# a single temperature disables the fallback retries the thresholds would trigger.
+DECODING_PROFILES = {
+    'fast': {
+        'pin_language': True,
+        'beam_size': None,
+        'temperature': 0.0,
+        'compression_ratio_threshold': None,
+        'logprob_threshold': None,
+        'no_speech_threshold': 0.6,
+        'condition_on_previous_text': False,
+    },
+    'balanced': {
+        'pin_language': True,
+        'beam_size': None,
+        'temperature': (0.0, 0.4, 0.8),
+        'compression_ratio_threshold': 2.4,
+        'logprob_threshold': -1.0,
+        'no_speech_threshold': 0.6,
+        'condition_on_previous_text': False,
+    },
+    'accurate': {
+        'pin_language': False,
+        'beam_size': 5,
+        'temperature': (0.0, 0.2, 0.4, 0.6, 0.8, 1.0),
+        'compression_ratio_threshold': 2.4,
+        'logprob_threshold': -1.0,
+        'no_speech_threshold': 0.6,
+        'condition_on_previous_text': True,
+    },
+}
+
+def get_decode_options(profile='balanced', language=None):
+    """Turns a decoding profile and a locale such as 'en-US' into Whisper transcribe() options."""
+    if profile not in DECODING_PROFILES:
+        logging.error(f"Unknown decoding profile: {profile}, falling back to balanced")
+        profile = 'balanced'
+    options = dict(DECODING_PROFILES[profile])
+    pin_language = options.pop('pin_language')
+    if options['beam_size'] is None:
+        del options['beam_size']
+    if pin_language and language:
+        options['language'] = language.split('-')[0].lower()
+    return options
+
+def get_download_root():
+    """Returns the directory Whisper model weights are stored in."""
+    if getattr(sys, 'frozen', False):
+        base_path = sys._MEIPASS
+    else:
+        base_path = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
+    return os.path.join(base_path, "whisper", "assets")
+
+class AsrBackend:
+    """Base class for speech recognition backends.
+
+    Subclasses set `name`, load their model in `load` and turn 16 kHz mono
+    float32 audio into text in `transcribe`.
+    """
+    name = None
+
+    def __init__(self, model_size='base'):
+        if model_size not in MODEL_SIZES:
+            raise ValueError(f"Unknown ASR model size: {model_size}")
+        self.model_size = model_size
+        self.model = None
+
+    def load(self):
+        raise NotImplementedError
+
+    def transcribe(self, audio_array, **options):
+        raise NotImplementedError
+
+    def replicate(self):
+        """Returns another instance that can decode concurrently with this one."""
+        raise NotImplementedError
+
+    def describe(self):
+        return f"{self.name} ({self.model_size})"
+
+class WhisperBackend(AsrBackend):
+    """openai-whisper in fp32 on CPU, fp16 on CUDA."""
+    name = 'whisper'
+
+    def __init__(self, model_size='base'):
+        super().__init__(model_size)
+        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+
+    def load(self):
+        self.model = whisper.load_model(
+            self.model_size,
+            device=self.device,
+            download_root=get_download_root()
+        )
+
+    def transcribe(self, audio_array, **options):
+        result = self.model.transcribe(audio_array, fp16=self.device == "cuda", **options)
+        return result["text"].strip()
+
+    def replicate(self):
+        # Copy the module tree (decoding installs hooks on it) but share parameter and buffer storage
+        memo = {id(tensor): tensor for tensor in self.model.parameters()}
+        memo.update({id(tensor): tensor for tensor in self.model.buffers()})
+        clone = copy.copy(self)
+        clone.model = copy.deepcopy(self.model, memo)
+        return clone
+
+class QuantizedWhisperBackend(WhisperBackend):
+    """openai-whisper on CPU with its linear layers dynamically quantized to int8."""
+    name = 'whisper-int8'
+
+    def __init__(self, model_size='base'):
+        super().__init__(model_size)
+        self.device = "cpu"
+
+    def load(self):
+        model = whisper.load_model(self.model_size, device="cpu", download_root=get_download_root())
+        # Whisper's Linear subclass only adds dtype casting, which is a no-op in fp32;
+        # quantize_dynamic matches exact types, so expose those layers as plain nn.Linear.
+        for module in model.modules():
+            if type(module) is whisper.model.Linear:
+                module.__class__ = torch.nn.Linear
+        self.model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+ASR_BACKENDS = {backend.name: backend for backend in (WhisperBackend, QuantizedWhisperBackend)}
+
+def create_backend(name='whisper', model_size='base'):
+    """Instantiates the ASR backend registered under `name`."""
+    if name not in ASR_BACKENDS:
+        logging.error(f"Unknown ASR backend: {name}, falling back to whisper")
+        name = 'whisper'
+    return ASR_BACKENDS[name](model_size)
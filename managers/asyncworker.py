@@ -0,0 +1,51 @@
+# asyncworker.py
+
+import asyncio
+import logging
+import threading
+
+class AsyncWorker:
+    """Runs one long-lived asyncio event loop on a dedicated thread.
+
+    Any thread can hand coroutines to the loop with submit() (returns a
+    concurrent.futures.Future) or run() (blocks for the result). Keeping a
+    single loop avoids creating and tearing one down for every request, and
+    lets resources bound to the loop be reused between requests.
+    """
+
+    def __init__(self, name='tts-io'):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.run_loop, name=name, daemon=True)
+        self.thread.start()
+
+    def run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro):
+        """Schedules a coroutine on the loop from any thread."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro, timeout=None):
+        """Runs a coroutine on the loop and waits for its result."""
+        if threading.current_thread() is self.thread:
+            raise RuntimeError("AsyncWorker.run() called from its own loop thread")
+        return self.submit(coro).result(timeout)
+
+    def stop(self, timeout=2.0):
+        """Cancels outstanding tasks and stops the loop."""
+        if not self.loop.is_running():
+            return
+
+        async def shutdown():
+            tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        try:
+            self.submit(shutdown()).result(timeout)
+        except Exception as e:
+            logging.error(f"Error shutting down async worker: {e}")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout)
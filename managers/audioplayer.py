@@ -0,0 +1,211 @@
+# audioplayer.py
+
+import collections
+import logging
+import queue
+import threading
+
+import numpy as np
+import sounddevice as sd
+
+from .resampler import resample
+from .ttsstream import PcmStream
+
+class PlayerClip:
+    """A clip queued on an AudioPlayer.
+
+    The source is either a complete float32 array or a PcmStream that is still
+    being filled by synthesis. `started` is set when the callback reaches the
+    clip and `done` when it has been played to the end; both are also set if
+    the clip is flushed, so waiters never hang. A caller-supplied `done`
+    Event can be passed in to be notified directly.
+    """
+
+    def __init__(self, source, done=None):
+        if isinstance(source, PcmStream):
+            self.stream = source
+            self.buffer = None
+        else:
+            self.stream = None
+            self.buffer = source
+        self.offset = 0
+        self.started = threading.Event()
+        self.done = done if done is not None else threading.Event()
+
+    def read(self, out):
+        """Copies as many frames as are available into `out`.
+
+        Returns (frames written, finished). A streaming clip that has no
+        decoded audio yet returns fewer frames without being finished.
+        """
+        written = 0
+        while written < len(out):
+            if self.buffer is None or self.offset >= len(self.buffer):
+                if self.stream is None:
+                    return written, True
+                try:
+                    block = self.stream.blocks.get_nowait()
+                except queue.Empty:
+                    return written, False
+                if block is None or self.stream.cancelled.is_set():
+                    return written, True
+                self.buffer = block
+                self.offset = 0
+            count = min(len(out) - written, len(self.buffer) - self.offset)
+            out[written:written + count] = self.buffer[self.offset:self.offset + count]
+            written += count
+            self.offset += count
+        return written, False
+
+    def release(self):
+        """Marks the clip as finished without playing the rest of it."""
+        if self.stream is not None:
+            self.stream.cancel()
+        self.started.set()
+        self.done.set()
+
+class AudioPlayer:
+    """One persistent output stream whose callback plays queued clips back to back.
+
+    The stream runs at the device's native sample rate and channel count
+    (up to stereo), so the host audio stack never resamples. Clips are
+    converted to that rate once, before they are queued; the callback only
+    copies mono float32 samples to every output channel. Clips are
+    concatenated inside the callback, so there is no gap between them.
+    skip() and flush() are applied at the start of the next callback, i.e.
+    within one block.
+    """
+
+    def __init__(self, device=None, blocksize=1024):
+        self.device = device
+        try:
+            info = sd.query_devices(device, 'output')
+        except Exception as e:
+            logging.error(f"Output device {device} unavailable, using the default device: {e}")
+            self.device = None
+            info = sd.query_devices(None, 'output')
+        self.samplerate = int(info['default_samplerate'])
+        self.channels = max(1, min(2, info['max_output_channels']))
+        self.blocksize = blocksize
+        self.clips = collections.deque()
+        self.stream = None
+        self.lock = threading.Lock()
+        self.skip_requested = False
+        self.flush_requested = False
+        self.stats = {
+            'clips_played': 0,
+            'clips_flushed': 0,
+            'underruns': 0,  # Blocks where the playing clip had not been decoded yet
+            'device_underflows': 0  # Blocks the device reported as not delivered in time
+        }
+
+    def ensure_stream(self):
+        """Opens the output stream on first use."""
+        with self.lock:
+            if self.stream is not None:
+                return
+            self.stream = sd.OutputStream(
+                device=self.device,
+                samplerate=self.samplerate,
+                channels=self.channels,
+                dtype='float32',
+                blocksize=self.blocksize,
+                callback=self.callback
+            )
+            self.stream.start()
+            logging.info(f"Output stream opened at {self.samplerate} Hz, {self.channels} channels on device {self.device}")
+
+    def convert(self, data, samplerate):
+        """Converts a complete clip to mono float32 at the stream's rate."""
+        data = np.asarray(data, dtype=np.float32)
+        if data.ndim > 1:
+            data = data.mean(axis=1, dtype=np.float32)
+        return resample(data, samplerate, self.samplerate)
+
+    def play(self, source, samplerate, done=None):
+        """Queues a clip behind the ones already playing and returns its PlayerClip.
+
+        A PcmStream must already deliver audio at the player's rate (see
+        PcmStream's `output_rate`); arrays are resampled here.
+        """
+        if isinstance(source, PcmStream):
+            if source.samplerate != self.samplerate:
+                logging.warning(f"Streamed clip at {source.samplerate} Hz played on a {self.samplerate} Hz stream")
+        else:
+            source = self.convert(source, samplerate)
+        clip = PlayerClip(source, done)
+        try:
+            self.ensure_stream()
+        except Exception as e:
+            logging.error(f"Error opening output stream: {e}")
+            clip.release()
+            return clip
+        self.clips.append(clip)
+        return clip
+
+    def callback(self, outdata, frames, time_info, status):
+        if status.output_underflow:
+            self.stats['device_underflows'] += 1
+        if self.flush_requested:
+            self.flush_requested = False
+            self.skip_requested = False
+            while self.clips:
+                self.clips.popleft().release()
+                self.stats['clips_flushed'] += 1
+        elif self.skip_requested:
+            self.skip_requested = False
+            if self.clips:
+                self.clips.popleft().release()
+                self.stats['clips_flushed'] += 1
+
+        out = outdata[:, 0]
+        filled = 0
+        while filled < frames and self.clips:
+            clip = self.clips[0]
+            clip.started.set()
+            count, finished = clip.read(out[filled:])
+            filled += count
+            if finished:
+                self.clips.popleft()
+                clip.done.set()
+                self.stats['clips_played'] += 1
+            elif filled < frames:
+                self.stats['underruns'] += 1
+                break
+        out[filled:] = 0
+        if self.channels > 1:
+            outdata[:, 1:] = outdata[:, :1]
+
+    def skip(self):
+        """Stops the clip that is playing; the next queued clip starts right away."""
+        if self.stream is None:
+            return
+        self.skip_requested = True
+
+    def flush(self):
+        """Drops the playing clip and everything queued behind it."""
+        if self.stream is None:
+            while self.clips:
+                self.clips.popleft().release()
+            return
+        self.flush_requested = True
+
+    def close_stream(self):
+        try:
+            self.stream.close()
+        except Exception as e:
+            logging.error(f"Error closing output stream: {e}")
+        self.stream = None
+
+    def close(self):
+        """Flushes queued clips and closes the output stream."""
+        self.flush()
+        with self.lock:
+            if self.stream is not None:
+                self.stream.abort()
+                self.close_stream()
+        while self.clips:
+            self.clips.popleft().release()
+
+    def get_stats(self):
+        return dict(self.stats, queued=len(self.clips))
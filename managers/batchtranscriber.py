@@ -0,0 +1,113 @@
+# batchtranscriber.py
+
+import glob
+import json
+import logging
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+from .asrbackends import create_backend, get_decode_options
+from .vad import VadSegmenter, SEGMENT_END
+
+SAMPLE_RATE = 16000
+AUDIO_EXTENSIONS = ('.wav', '.flac')
+
+# Loaded once per worker process by init_worker
+_worker_backend = None
+_worker_options = {}
+
+def find_audio_files(paths):
+    """Expands directories into the WAV/FLAC files they contain."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(glob.glob(os.path.join(path, '*'))):
+                if name.lower().endswith(AUDIO_EXTENSIONS):
+                    files.append(name)
+        elif path.lower().endswith(AUDIO_EXTENSIONS):
+            files.append(path)
+        else:
+            logging.warning(f"Skipping unsupported file: {path}")
+    return files
+
+def load_audio(path):
+    """Decodes a file to 16 kHz mono float32."""
+    import whisper
+    return whisper.load_audio(path, sr=SAMPLE_RATE)
+
+def split_segments(audio_array, segmenter=None):
+    """Runs the live VAD segmenter over a whole file and returns (start, end) sample ranges."""
+    if segmenter is None:
+        segmenter = VadSegmenter(sample_rate=SAMPLE_RATE)
+    segmenter.reset()
+    pcm = (np.clip(audio_array, -1.0, 1.0) * 32767).astype(np.int16)
+    frame_size = segmenter.frame_size
+    segments = []
+    for offset in range(0, len(pcm) - frame_size + 1, frame_size):
+        event = segmenter.feed(pcm[offset:offset + frame_size])
+        if event is not None and event.kind == SEGMENT_END:
+            segments.append((event.start, event.end))
+    event = segmenter.flush()
+    if event is not None:
+        segments.append((event.start, event.end))
+    return segments
+
+def init_worker(asr_backend, asr_model, threads, decode_options=None):
+    """Loads the ASR model once in each worker process."""
+    global _worker_backend, _worker_options
+    _worker_options = decode_options or {}
+    import torch
+    torch.set_num_threads(threads)
+    _worker_backend = create_backend(asr_backend, asr_model)
+    _worker_backend.load()
+
+def transcribe_segment(job):
+    """Transcribes one segment in a worker process and returns its JSON record."""
+    path, index, start, end, audio_array = job
+    start_time = time.perf_counter()
+    text = _worker_backend.transcribe(audio_array, **_worker_options)
+    decode_time = time.perf_counter() - start_time
+    duration = (end - start) / SAMPLE_RATE
+    return {
+        'file': path,
+        'segment': index,
+        'start': round(start / SAMPLE_RATE, 3),
+        'end': round(end / SAMPLE_RATE, 3),
+        'text': text,
+        'decode_time': round(decode_time, 3),
+        'rtf': round(decode_time / duration, 3) if duration else None,
+        'worker': os.getpid(),
+    }
+
+def iter_jobs(files):
+    """Decodes and segments each file, yielding one job per speech segment."""
+    segmenter = VadSegmenter(sample_rate=SAMPLE_RATE)
+    for path in files:
+        try:
+            audio_array = load_audio(path)
+        except Exception as e:
+            logging.error(f"Failed to load {path}: {e}")
+            continue
+        segments = split_segments(audio_array, segmenter)
+        logging.info(f"{path}: {len(segments)} speech segments")
+        for index, (start, end) in enumerate(segments):
+            yield path, index, start, end, audio_array[start:end]
+
+def transcribe_files(files, output, workers=2, asr_backend='whisper', asr_model='base',
+                     decoding_profile='balanced', language=None):
+    """Transcribes every speech segment across a process pool, writing JSONL records in order."""
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    decode_options = get_decode_options(decoding_profile, language)
+    start_time = time.perf_counter()
+    count = 0
+    initargs = (asr_backend, asr_model, threads, decode_options)
+    with multiprocessing.Pool(workers, initializer=init_worker, initargs=initargs) as pool:
+        for record in pool.imap(transcribe_segment, iter_jobs(files)):
+            output.write(json.dumps(record, ensure_ascii=False) + '\n')
+            output.flush()
+            count += 1
+    logging.info(f"Transcribed {count} segments from {len(files)} files in {time.perf_counter() - start_time:.2f}s")
+    return count
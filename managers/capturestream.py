@@ -0,0 +1,145 @@
+# capturestream.py
+
+import collections
+import logging
+import threading
+import numpy as np
+import sounddevice as sd
+
+# A captured utterance, referenced by absolute sample positions in a stream's ring
+CapturedSegment = collections.namedtuple('CapturedSegment', ['stream', 'start', 'end'])
+
+class CaptureStream:
+    """Long-lived input stream that records continuously into a preallocated int16 ring buffer.
+
+    The audio callback only copies samples into the ring; consumers keep their own
+    absolute sample cursor and read from the buffer at their own pace, so capture
+    never stops while audio is being transcribed.
+    """
+
+    def __init__(self, device=None, sample_rate=16000, buffer_seconds=30, block_duration=30):
+        self.device = device
+        self.sample_rate = sample_rate
+        self.capacity = int(sample_rate * buffer_seconds)
+        self.blocksize = int(sample_rate * block_duration / 1000)
+        self.buffer = np.zeros(self.capacity, dtype=np.int16)
+        self.position = 0  # Total number of samples written since start
+        self.overflows = 0  # Callbacks where PortAudio reported lost input; logged on stop
+        self.condition = threading.Condition()
+        self.stream = None
+
+    def start(self):
+        """Opens the input device and starts capturing."""
+        if self.stream is not None:
+            return
+        self.stream = sd.InputStream(
+            samplerate=self.sample_rate,
+            channels=1,
+            dtype='int16',
+            device=self.device,
+            blocksize=self.blocksize,
+            latency='low',
+            callback=self._callback
+        )
+        self.stream.start()
+        logging.info(f"Capture stream started on device {self.device}.")
+
+    def stop(self):
+        """Stops capturing and closes the input device."""
+        if self.stream is None:
+            return
+        try:
+            self.stream.stop()
+            self.stream.close()
+        except Exception as e:
+            logging.error(f"Error closing capture stream: {e}")
+        finally:
+            self.stream = None
+            with self.condition:
+                self.condition.notify_all()
+            logging.info(f"Capture stream stopped on device {self.device} ({self.overflows} input overflows).")
+
+    @property
+    def active(self):
+        return self.stream is not None
+
+    def _callback(self, indata, frames, time_info, status):
+        if status.input_overflow:
+            self.overflows += 1
+        samples = indata[:, 0]
+        with self.condition:
+            start = self.position % self.capacity
+            end = start + frames
+            if end <= self.capacity:
+                self.buffer[start:end] = samples
+            else:
+                split = self.capacity - start
+                self.buffer[start:] = samples[:split]
+                self.buffer[:end - self.capacity] = samples[split:]
+            self.position += frames
+            self.condition.notify_all()
+
+    def oldest_position(self):
+        """Returns the oldest absolute sample position still held in the ring."""
+        return max(0, self.position - self.capacity)
+
+    def wait_for(self, position, timeout=None):
+        """Blocks until the stream has written up to `position`. Returns False on timeout or stop."""
+        with self.condition:
+            return self.condition.wait_for(
+                lambda: self.position >= position or self.stream is None,
+                timeout=timeout
+            ) and self.position >= position
+
+    def read(self, position, num_samples, timeout=None):
+        """Returns `num_samples` samples starting at absolute `position`, waiting for them if needed.
+
+        Reads are block aligned, so the result is normally a view into the ring
+        rather than a copy and must be consumed before the ring wraps around.
+        Returns None if the samples did not arrive within `timeout` or have
+        already been overwritten.
+        """
+        if not self.wait_for(position + num_samples, timeout):
+            return None
+        first = position % self.capacity
+        if first + num_samples > self.capacity:
+            return self.get_range(position, position + num_samples)
+        if position < self.oldest_position():
+            return None
+        return self.buffer[first:first + num_samples]
+
+    def get_range(self, start, end):
+        """Copies the absolute sample range [start, end) out of the ring."""
+        with self.condition:
+            if start < self.oldest_position() or end > self.position:
+                return None
+            out = np.empty(end - start, dtype=np.int16)
+            first = start % self.capacity
+            count = end - start
+            if first + count <= self.capacity:
+                out[:] = self.buffer[first:first + count]
+            else:
+                split = self.capacity - first
+                out[:split] = self.buffer[first:]
+                out[split:] = self.buffer[:count - split]
+            return out
+
+    def to_float32(self, start, end, out):
+        """Converts the absolute range [start, end) to float32 in [-1, 1) directly into `out`.
+
+        No intermediate arrays are created. Returns a view of the filled part of
+        `out`, or None if the range is not (or no longer) held in the ring.
+        """
+        count = end - start
+        if start < self.oldest_position() or end > self.position:
+            return None
+        first = start % self.capacity
+        split = min(count, self.capacity - first)
+        scale = np.float32(1.0 / 32768.0)
+        np.multiply(self.buffer[first:first + split], scale, out=out[:split], dtype=np.float32)
+        if split < count:
+            np.multiply(self.buffer[:count - split], scale, out=out[split:count], dtype=np.float32)
+        # The callback may have lapped us while converting
+        if start < self.oldest_position():
+            return None
+        return out[:count]
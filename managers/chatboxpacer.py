@@ -0,0 +1,82 @@
+# chatboxpacer.py
+
+import threading
+import time
+
+class TokenBucket:
+    """Rate limiter allowing `burst` sends at once and one more every `interval` seconds."""
+
+    def __init__(self, interval, burst=1):
+        self.interval = max(0.0, interval)
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def refill(self, now):
+        if self.interval > 0:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) / self.interval)
+        else:
+            self.tokens = float(self.capacity)
+        self.updated = now
+
+    def try_acquire(self):
+        """Takes a token if one is available; otherwise returns the seconds until one is."""
+        with self.lock:
+            self.refill(time.monotonic())
+            if self.tokens >= 1.0:
+                self.tokens -= 1.0
+                return 0.0
+            return (1.0 - self.tokens) * self.interval
+
+class ChatboxPacer:
+    """Decides when the next chatbox chunk may be sent.
+
+    A chunk stays up for as long as it takes to read it (its length at
+    `chars_per_second`, but at least `min_display` seconds) and for as long as
+    its TTS audio is playing, whichever is longer. Independently, sends to
+    /chatbox/input are limited by a token bucket of one send per
+    `min_interval` seconds with `burst` sends of slack. The next chunk goes
+    out as soon as both allow it.
+    """
+
+    def __init__(self, chars_per_second=15.0, min_display=2.0, min_interval=1.5, burst=1,
+                 max_speech_wait=60.0, chatbox_enabled=None):
+        self.chars_per_second = max(1.0, chars_per_second)
+        self.min_display = min_display
+        self.max_speech_wait = max_speech_wait
+        self.bucket = TokenBucket(min_interval, burst)
+        # Callable returning whether chunks currently go to the chatbox at all
+        self.chatbox_enabled = chatbox_enabled or (lambda: True)
+
+    def display_time(self, chunk):
+        """Seconds a chunk needs on screen to be read."""
+        return max(self.min_display, len(chunk) / self.chars_per_second)
+
+    def wait_for_slot(self, cancel):
+        """Blocks until the rate limit allows a send. Returns False if cancelled first."""
+        if not self.chatbox_enabled():
+            return not cancel.is_set()
+        while True:
+            delay = self.bucket.try_acquire()
+            if delay <= 0:
+                return not cancel.is_set()
+            if cancel.wait(delay):
+                return False
+
+    def wait_until_read(self, chunk, sent_at, speech_done, cancel):
+        """Blocks until a chunk sent at `sent_at` has been read and spoken.
+
+        `speech_done` is an Event set when the chunk's TTS playback ends, or
+        None if it is not spoken. Returns False if cancelled first.
+        """
+        if speech_done is not None:
+            # Cancelling the output also releases speech_done, so this cannot outlive a cancel
+            speech_done.wait(self.max_speech_wait)
+            if cancel.is_set():
+                return False
+        if self.chatbox_enabled():
+            remaining = sent_at + self.display_time(chunk) - time.monotonic()
+            if remaining > 0 and cancel.wait(remaining):
+                return False
+        return not cancel.is_set()
@@ -5,98 +5,285 @@ warnings.filterwarnings("ignore", category=UserWarning)
 warnings.filterwarnings("ignore", category=FutureWarning)
 
 import logging
-import whisper  # This imports the correct 'whisper' module from 'openai-whisper'
 import sounddevice as sd
 import numpy as np
-import torch
-import webrtcvad
-import collections
-import sys
-import os
+import queue
+import threading
+import time
+from .asrbackends import create_backend, get_decode_options
+from .capturestream import CaptureStream, CapturedSegment
+from .transcriptionpipeline import SegmentDropped
+from .vad import EnergyGate, VadSegmenter, SEGMENT_START, SEGMENT_END
+
+class DecoderSlot:
+    """One ASR model replica plus the float32 scratch buffer its input is converted into."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.scratch = np.empty(0, dtype=np.float32)
+
+    def to_float32(self, segment):
+        """Converts a captured segment into this slot's reusable scratch buffer."""
+        count = segment.end - segment.start
+        if len(self.scratch) < count:
+            self.scratch = np.empty(count, dtype=np.float32)
+        return segment.stream.to_float32(segment.start, segment.end, self.scratch)
 
 class InputManager:
-    def __init__(self):
-        logging.info("Loading Whisper model...")
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+    def __init__(self, on_model_ready=None, asr_backend='whisper', asr_model='base', asr_workers=1,
+                 decoding_profile='balanced', language=None, max_pending_segments=4):
+        self.backend = None
+        self.set_decoding_profile(decoding_profile, language)
+        self.asr_workers = max(1, asr_workers)
+        self.decoders = queue.Queue()  # Idle DecoderSlots; one per concurrent transcription
+        self.model_ready = threading.Event()
+        self.model_failed = False
+        self.on_model_ready = on_model_ready
+        self.sample_rate = 16000
+        self.max_pending_segments = max_pending_segments
+        self.max_utterance_seconds = 10.0
+        # Segments reference the ring until they are transcribed, so it holds every queued and
+        # in-flight utterance plus the one being captured, with a little headroom
+        self.capture_buffer_seconds = (max_pending_segments + self.asr_workers + 1) * self.max_utterance_seconds + 5
+        self.primary_device = None  # Device used when none is given; fixed from sd.default.device on first use
+        self.segmenters = {}  # One VAD segmenter per input device
+        self.capture_streams = {}  # One long-lived capture stream per input device
+        self.read_positions = {}  # Read cursor into each device's ring buffer
+
+        self.load_model_async(asr_backend, asr_model)
+
+    def set_decoding_profile(self, decoding_profile, language=None):
+        """Selects the decoding profile applied to every transcription."""
+        self.decoding_profile = decoding_profile
+        self.decode_options = get_decode_options(decoding_profile, language)
+        logging.info(f"Decoding profile {decoding_profile}: {self.decode_options}")
+
+    def load_model_async(self, asr_backend, asr_model):
+        """Loads the ASR model in the background so the UI is usable straight away."""
+        self.model_ready.clear()
+        self.model_failed = False
+        threading.Thread(target=self.load_model, args=(asr_backend, asr_model), daemon=True).start()
+
+    def load_model(self, asr_backend, asr_model):
+        """Loads the ASR backend, runs a warm-up inference and signals readiness."""
         try:
-            # Get the base directory for the application
-            if getattr(sys, 'frozen', False):
-                base_path = sys._MEIPASS
-            else:
-                base_path = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
-            
-            # Initialize Whisper with the correct model path
-            self.model = whisper.load_model(
-                "base", 
-                device=self.device,
-                download_root=os.path.join(base_path, "whisper", "assets")
-            )
-            logging.info(f"Whisper model loaded on {self.device}.")
+            backend = create_backend(asr_backend, asr_model)
+            logging.info(f"Loading ASR model {backend.describe()}...")
+            start_time = time.perf_counter()
+            backend.load()
+            logging.info(f"ASR model {backend.describe()} loaded in {time.perf_counter() - start_time:.2f}s.")
+            # Whisper installs per-call hooks on its modules, so each concurrent decoder
+            # needs its own module tree; replicas share the weight tensors.
+            decoders = queue.Queue()
+            decoders.put(DecoderSlot(backend))
+            for _ in range(self.asr_workers - 1):
+                decoders.put(DecoderSlot(backend.replicate()))
+            self.warm_up(backend)
+            self.backend = backend
+            self.decoders = decoders
+            self.model_ready.set()
         except Exception as e:
-            logging.error(f"Failed to load Whisper model: {e}")
-            raise
-        self.vad = webrtcvad.Vad(2)  # Aggressiveness from 0 to 3
-        self.stream = None
+            logging.error(f"Failed to load ASR model: {e}")
+            self.model_failed = True
+        if self.on_model_ready:
+            self.on_model_ready(not self.model_failed)
 
-    def get_voice_input(self):
-        logging.info("Listening for voice input with VAD...")
-        sample_rate = 16000
-        frame_duration = 30  # ms
-        num_padding_frames = 10
-        threshold = 0.9  # Ratio of voiced frames needed
+    def warm_up(self, backend):
+        """Runs one inference on silence so the first real utterance skips one-time setup costs."""
+        start_time = time.perf_counter()
+        try:
+            backend.transcribe(np.zeros(self.sample_rate, dtype=np.float32), temperature=0.0)
+            logging.info(f"ASR warm-up finished in {time.perf_counter() - start_time:.2f}s.")
+        except Exception as e:
+            logging.warning(f"ASR warm-up failed: {e}")
+
+    def get_capture_stream(self, device=None):
+        """Returns the running capture stream for a device, starting it on first use."""
+        if device is None:
+            if self.primary_device is None:
+                self.primary_device = sd.default.device[0]
+            device = self.primary_device
+        stream = self.capture_streams.get(device)
+        if stream is None:
+            stream = CaptureStream(device=device, sample_rate=self.sample_rate, buffer_seconds=self.capture_buffer_seconds)
+            stream.start()
+            self.capture_streams[device] = stream
+            self.read_positions[device] = stream.position
+            self.segmenters[device] = VadSegmenter(
+                sample_rate=self.sample_rate,
+                max_duration=self.max_utterance_seconds,
+                aggressiveness=2,
+                gate=EnergyGate()
+            )
+        return stream
+
+    def set_primary_device(self, device):
+        """Switches the primary input device, closing the stream of the previous one.
+
+        A capture thread reading the old stream gets no more audio and moves to
+        the new device with its next utterance.
+        """
+        previous = self.primary_device
+        self.primary_device = device
+        if previous is None or previous == device:
+            return
+        if self.close_stream(previous):
+            logging.info(f"Primary input device changed from {previous} to {device}.")
+
+    def close_stream(self, device):
+        """Stops a device's capture stream and forgets its cursor and segmenter.
+
+        The next capture on the device opens a new stream. Returns False if the
+        device had no stream.
+        """
+        stream = self.capture_streams.pop(device, None)
+        self.read_positions.pop(device, None)
+        self.segmenters.pop(device, None)
+        if stream is None:
+            return False
+        stream.stop()
+        return True
 
-        ring_buffer = collections.deque(maxlen=num_padding_frames)
-        triggered = False
-        voiced_frames = []
+    def read_frame(self, stream, num_samples, timeout=1.0):
+        """Reads the next frame for a stream from its ring buffer and advances the cursor.
+
+        Returns data None once the stream has been stopped.
+        """
+        position = self.read_positions.get(stream.device)
+        if position is None or not stream.active:
+            return None, None
+        if position < stream.oldest_position():
+            logging.warning("Audio buffer overflowed")
+            position = stream.oldest_position()
+        data = stream.read(position, num_samples, timeout=timeout)
+        if data is not None and stream.active:
+            self.read_positions[stream.device] = position + num_samples
+        return position, data
+
+    def skip_to_live(self):
+        """Moves every read cursor to the newest captured sample, discarding audio heard while idle."""
+        for device, stream in list(self.capture_streams.items()):
+            self.read_positions[device] = stream.position
+
+    def close(self):
+        """Stops all capture streams."""
+        for device, segmenter in self.segmenters.items():
+            logging.info(
+                f"Energy gate on device {device} passed {segmenter.gate.pass_ratio():.1%} of frames to VAD "
+                f"(noise floor {segmenter.gate.floor_db:.1f} dBFS)"
+            )
+        for stream in self.capture_streams.values():
+            stream.stop()
+        self.capture_streams.clear()
+        self.read_positions.clear()
+
+    def capture_utterance(self, on_partial=None, partial_interval=0.5, device=None, active=None):
+        """Reads the capture ring until VAD closes a segment and returns it as a CapturedSegment.
+
+        The segment only references the ring; audio is converted to float32 when
+        it is transcribed, so nothing is copied on the capture thread.
+
+        If `on_partial` is given, the growing utterance is re-decoded every
+        `partial_interval` seconds of audio while the user is still speaking and
+        the unstable hypothesis is passed to `on_partial`.
+
+        Each device has its own stream, cursor and segmenter, so one thread per
+        device can call this concurrently. If `active` (a threading.Event) is
+        cleared while listening, any partial segment is dropped and None is returned.
+
+        None is also returned if the device cannot be opened or stops delivering
+        audio; a stream that stopped delivering is closed so the next call
+        reopens the device.
+        """
+        logging.info("Listening for voice input with VAD...")
+        segment = None
+        partial_step = int(self.sample_rate * partial_interval)
+        stream = None
 
         try:
-            with sd.InputStream(
-                samplerate=sample_rate,
-                channels=1,
-                dtype='int16',
-                device=sd.default.device[0],  # Explicitly use default input device
-                latency='low'
-            ) as stream:
-                while True:
-                    data, overflowed = stream.read(int(sample_rate * frame_duration / 1000))
-                    if overflowed:
-                        logging.warning("Audio buffer overflowed")
-                    
-                    is_speech = self.vad.is_speech(data.tobytes(), sample_rate)
-                    if not triggered:
-                        ring_buffer.append((data.tobytes(), is_speech))
-                        num_voiced = len([f for f, speech in ring_buffer if speech])
-                        if num_voiced > threshold * num_padding_frames:
-                            triggered = True
-                            voiced_frames.extend([f for f, s in ring_buffer])
-                            ring_buffer.clear()
-                    else:
-                        voiced_frames.append(data.tobytes())
-                        ring_buffer.append((data.tobytes(), is_speech))
-                        num_unvoiced = len([f for f, speech in ring_buffer if not speech])
-                        if num_unvoiced > threshold * num_padding_frames:
-                            break  # End of speech
-                    if len(voiced_frames) > sample_rate * 10:  # Limit recording to 10 seconds
-                        logging.info("Max recording duration reached.")
-                        break
+            stream = self.get_capture_stream(device)
+            segmenter = self.segmenters[stream.device]
+            segmenter.reset(self.read_positions[stream.device])
+            last_partial = None
+            while active is None or active.is_set():
+                position, data = self.read_frame(stream, segmenter.frame_size)
+                if data is None:
+                    logging.warning(f"No audio received from capture stream on device {stream.device}")
+                    if self.capture_streams.get(stream.device) is stream:
+                        self.close_stream(stream.device)
+                    break
+                if position != segmenter.position:
+                    # The cursor was moved forward after an overflow; drop any partial segment
+                    segmenter.reset(position)
+                    last_partial = None
+
+                event = segmenter.feed(data)
+                if event is not None and event.kind == SEGMENT_START:
+                    last_partial = event.start
+                elif event is not None and event.kind == SEGMENT_END:
+                    segment = CapturedSegment(stream, event.start, event.end)
+                    break
+
+                # Only re-decode once caught up with live audio, so slow decodes never snowball
+                if (on_partial is not None and segmenter.triggered
+                        and segmenter.position - last_partial >= partial_step
+                        and stream.position - segmenter.position < segmenter.frame_size * 2):
+                    window = CapturedSegment(stream, segmenter.segment_start, segmenter.position)
+                    last_partial = segmenter.position
+                    # Skip the partial rather than wait if every decoder is busy
+                    try:
+                        partial = self.transcribe(window, blocking=False, temperature=0.0)
+                    except SegmentDropped:
+                        partial = None
+                    if partial:
+                        on_partial(partial)
 
         except Exception as e:
             logging.error(f"Error during voice input: {e}")
+            if stream is not None and self.capture_streams.get(stream.device) is stream:
+                self.close_stream(stream.device)
             return None
 
-        if not voiced_frames:
+        if segment is None:
             logging.info("No speech detected.")
-            return None
+        return segment
 
-        audio_data = b''.join(voiced_frames)
-        audio_array = np.frombuffer(audio_data, dtype='int16').astype(np.float32) / 32768.0
+    def transcribe(self, audio_array, blocking=True, **options):
+        """Runs the ASR backend on float32 audio or a CapturedSegment and returns the stripped text.
 
-        logging.info("Transcribing voice input...")
+        Raises SegmentDropped if a CapturedSegment has been overwritten in the
+        ring. Each call borrows an idle decoder slot; with `blocking=False` None
+        is returned immediately if all of them are busy. Keyword options
+        override the current decoding profile.
+        """
+        if not self.model_ready.is_set():
+            logging.warning("ASR model is not loaded yet.")
+            return None
+        decoders = self.decoders
         try:
-            result = self.model.transcribe(audio_array, fp16=torch.cuda.is_available())
-            text = result["text"].strip()
-            logging.info(f"Transcribed text: {text}")
+            slot = decoders.get(block=blocking)
+        except queue.Empty:
+            return None
+        try:
+            if isinstance(audio_array, CapturedSegment):
+                audio_array = slot.to_float32(audio_array)
+                if audio_array is None:
+                    raise SegmentDropped("captured audio was overwritten before it could be transcribed")
+            start_time = time.perf_counter()
+            text = slot.backend.transcribe(audio_array, **{**self.decode_options, **options})
+            latency = time.perf_counter() - start_time
+            duration = len(audio_array) / self.sample_rate
+            # Partial decodes (non-blocking) are frequent, keep them out of the info log
+            logging.log(
+                logging.INFO if blocking else logging.DEBUG,
+                f"Decoded {duration:.2f}s of audio in {latency:.2f}s "
+                f"(profile {self.decoding_profile}, RTF {latency / max(duration, 1e-6):.2f})"
+            )
             return text
+        except SegmentDropped:
+            raise
         except Exception as e:
             logging.error(f"Error during transcription: {e}")
             return None
+        finally:
+            decoders.put(slot)
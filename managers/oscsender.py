@@ -0,0 +1,146 @@
+# oscsender.py
+
+import logging
+import queue
+import socket
+import threading
+
+from pythonosc.osc_message_builder import OscMessageBuilder
+
+# Queued by set_endpoints to wake the sender thread so it resolves the new targets
+RESOLVE = object()
+
+def parse_endpoint(text):
+    """Parses 'host:port' or '[ipv6]:port' into (host, port); raises ValueError if malformed."""
+    host, _, port = text.strip().rpartition(':')
+    if not host:
+        raise ValueError(f"Expected host:port, got {text!r}")
+    if host.startswith('[') and host.endswith(']'):
+        host = host[1:-1]
+    elif ':' in host:
+        raise ValueError(f"IPv6 addresses need brackets, as in [::1]:9000; got {text!r}")
+    return host, int(port)
+
+class OscSender:
+    """Sends OSC messages to several endpoints from a dedicated thread.
+
+    send() only encodes the message and queues it, so callers never block on
+    the network. The sender thread writes each datagram once per endpoint over
+    one UDP socket per address family (IPv4, IPv6); the encoded bytes are
+    shared by all endpoints. Send and error counts are kept per endpoint.
+    """
+
+    def __init__(self, endpoints, max_pending=64):
+        self.sockets = {}  # Address family -> UDP socket; only touched by the sender thread
+        self.messages = queue.Queue(maxsize=max_pending)
+        self.lock = threading.Lock()
+        self.endpoints = []
+        self.pending_endpoints = None  # New (host, port) list for the sender thread to resolve
+        self.stats = {}
+        self.dropped = 0
+        self.set_endpoints(endpoints)
+        self.thread = threading.Thread(target=self.send_loop, daemon=True)
+        self.thread.start()
+
+    def set_endpoints(self, endpoints):
+        """Replaces the target list. Counters of kept endpoints survive.
+
+        Host names are resolved once, on the sender thread, so this never
+        blocks on DNS; messages queued before the call may still go to the
+        old targets.
+        """
+        with self.lock:
+            self.pending_endpoints = list(endpoints)
+        try:
+            self.messages.put_nowait(RESOLVE)
+        except queue.Full:
+            pass  # The sender picks the change up with the next queued message
+
+    def resolve_pending(self):
+        """Resolves the endpoints set by set_endpoints, if any. Runs on the sender thread."""
+        with self.lock:
+            endpoints, self.pending_endpoints = self.pending_endpoints, None
+        if endpoints is None:
+            return
+        resolved = []
+        for host, port in endpoints:
+            try:
+                family, _, _, _, address = socket.getaddrinfo(host, port, type=socket.SOCK_DGRAM)[0]
+            except (OSError, ValueError) as e:
+                logging.error(f"Cannot resolve OSC endpoint {host}:{port}: {e}")
+                continue
+            name = f"[{host}]:{port}" if ':' in host else f"{host}:{port}"
+            resolved.append((name, family, address))
+        with self.lock:
+            self.endpoints = resolved
+            self.stats = {
+                name: self.stats.get(name, {'sent': 0, 'bytes': 0, 'errors': 0})
+                for name, _, _ in resolved
+            }
+        logging.info(f"OSC endpoints: {', '.join(name for name, _, _ in resolved) or 'none'}")
+
+    def get_socket(self, family):
+        sock = self.sockets.get(family)
+        if sock is None:
+            sock = self.sockets[family] = socket.socket(family, socket.SOCK_DGRAM)
+        return sock
+
+    @staticmethod
+    def encode(address, values):
+        builder = OscMessageBuilder(address=address)
+        for value in values:
+            builder.add_arg(value)
+        return builder.build().dgram
+
+    def send(self, address, values):
+        """Encodes a message and queues it for every endpoint. Returns False if it was dropped."""
+        try:
+            self.messages.put_nowait(self.encode(address, values))
+            return True
+        except queue.Full:
+            with self.lock:
+                self.dropped += 1
+            logging.warning(f"OSC send queue full; dropped message to {address}")
+            return False
+
+    def send_loop(self):
+        while True:
+            dgram = self.messages.get()
+            if dgram is None:
+                return
+            self.resolve_pending()
+            if dgram is RESOLVE:
+                continue
+            with self.lock:
+                endpoints = list(self.endpoints)
+            for name, family, address in endpoints:
+                try:
+                    self.get_socket(family).sendto(dgram, address)
+                    outcome = 'sent'
+                except OSError as e:
+                    logging.error(f"OSC send to {name} failed: {e}")
+                    outcome = 'errors'
+                with self.lock:
+                    counters = self.stats.get(name)
+                    if counters is not None:
+                        counters[outcome] += 1
+                        if outcome == 'sent':
+                            counters['bytes'] += len(dgram)
+
+    def get_stats(self):
+        """Returns per-endpoint counters plus the number of messages dropped on a full queue."""
+        with self.lock:
+            return {
+                'endpoints': {name: dict(counters) for name, counters in self.stats.items()},
+                'dropped': self.dropped,
+            }
+
+    def close(self, timeout=1.0):
+        """Sends what is already queued, then stops the thread and closes the sockets."""
+        try:
+            self.messages.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self.thread.join(timeout)
+        for sock in list(self.sockets.values()):
+            sock.close()
@@ -0,0 +1,168 @@
+# outputdispatcher.py
+
+import collections
+import heapq
+import logging
+import threading
+import time
+
+PRIORITY_URGENT = 0
+PRIORITY_NORMAL = 1
+
+class OutputDispatcher:
+    """Delivers messages to TTS and the chatbox one at a time, in order.
+
+    Each message is an iterable of chunks, read lazily as they are delivered,
+    so a generator can still be producing later chunks while the first plays.
+    A single worker thread takes messages from a bounded priority queue
+    (urgent first, then submission order), so chunks of different messages
+    never interleave.
+
+    Speech and chatbox are handed off separately. `speak(chunk)` queues a
+    chunk for TTS and returns an Event set when it has been spoken (or None);
+    up to `lookahead` chunks beyond the one on screen are queued at once, so
+    they are synthesized while earlier ones play. `show(chunk)` sends a chunk
+    to the chatbox once the optional `pacer` (a ChatboxPacer) allows it: after
+    the previous chunk has been spoken and read, within the rate limit. An
+    urgent message pre-empts a normal message that is being delivered;
+    cancelling calls `cancel_output()` to stop the speech already handed off.
+    """
+
+    def __init__(self, speak, show, cancel_output, max_pending=8, pacer=None, lookahead=2):
+        self.speak = speak
+        self.show = show
+        self.cancel_output = cancel_output
+        self.lookahead = max(0, lookahead)
+        self.max_pending = max_pending
+        self.pacer = pacer
+        self.condition = threading.Condition()
+        # Held while a chunk is handed off, so a cancel never lands between the check and the delivery
+        self.delivery_lock = threading.Lock()
+        self.pending = []  # Heap of (priority, sequence, chunks)
+        self.next_sequence = 0
+        self.current_priority = None
+        self.current_cancel = None
+        self.metrics = {
+            'submitted': 0,
+            'delivered': 0,
+            'rejected': 0,
+            'cancelled': 0,
+            'cleared': 0,
+            'max_queue_depth': 0,
+        }
+        self.running = True
+        self.worker = threading.Thread(target=self.worker_loop, daemon=True)
+        self.worker.start()
+
+    def submit(self, chunks, priority=PRIORITY_NORMAL):
+        """Queues a message. Returns False if the queue is full and the message was rejected.
+
+        Urgent messages are always accepted and pre-empt a normal message that
+        is being delivered.
+        """
+        if not chunks:
+            return True
+        with self.condition:
+            if priority != PRIORITY_URGENT and len(self.pending) >= self.max_pending:
+                self.metrics['rejected'] += 1
+                logging.warning(f"Output queue full ({len(self.pending)} messages); message rejected.")
+                return False
+            heapq.heappush(self.pending, (priority, self.next_sequence, chunks))
+            self.next_sequence += 1
+            self.metrics['submitted'] += 1
+            self.metrics['max_queue_depth'] = max(self.metrics['max_queue_depth'], len(self.pending))
+            # Remember which message to pre-empt; by the time it is cancelled the worker may have moved on
+            preempted = None
+            if self.current_priority is not None and priority < self.current_priority:
+                preempted = self.current_cancel
+            self.condition.notify()
+        if preempted is not None and self.cancel_current(only=preempted):
+            logging.info("Urgent message pre-empts the current output.")
+        return True
+
+    def cancel_current(self, only=None):
+        """Stops the message being delivered, including speech already queued for it.
+
+        With `only` (the cancel Event of a message), nothing happens unless that
+        message is still the one being delivered.
+        """
+        with self.delivery_lock:
+            with self.condition:
+                cancel = self.current_cancel
+            if cancel is None or cancel.is_set() or (only is not None and cancel is not only):
+                return False
+            cancel.set()
+            self.cancel_output()
+        return True
+
+    def clear_queue(self):
+        """Drops every message waiting behind the current one. Returns how many were dropped."""
+        with self.condition:
+            cleared = len(self.pending)
+            self.pending.clear()
+            self.metrics['cleared'] += cleared
+        if cleared:
+            logging.info(f"Cleared {cleared} queued messages.")
+        return cleared
+
+    def worker_loop(self):
+        while True:
+            with self.condition:
+                while self.running and not self.pending:
+                    self.condition.wait()
+                if not self.running:
+                    return
+                priority, _, chunks = heapq.heappop(self.pending)
+                cancel = threading.Event()
+                self.current_priority = priority
+                self.current_cancel = cancel
+            self.deliver_message(chunks, cancel)
+            with self.condition:
+                self.current_priority = None
+                self.current_cancel = None
+                self.metrics['cancelled' if cancel.is_set() else 'delivered'] += 1
+
+    def deliver_message(self, chunks, cancel):
+        chunks = iter(chunks)
+        spoken = collections.deque()  # (chunk, speech_done) queued for TTS but not yet shown
+        while True:
+            # Keep the chunk about to be shown and `lookahead` more queued for speech
+            while len(spoken) <= self.lookahead:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                with self.delivery_lock:
+                    if cancel.is_set():
+                        return
+                    spoken.append((chunk, self.hand_off(self.speak, chunk)))
+            if not spoken:
+                return
+            chunk, speech_done = spoken.popleft()
+            if self.pacer is not None and not self.pacer.wait_for_slot(cancel):
+                return
+            with self.delivery_lock:
+                if cancel.is_set():
+                    return
+                sent_at = time.monotonic()
+                self.hand_off(self.show, chunk)
+            if self.pacer is not None and not self.pacer.wait_until_read(chunk, sent_at, speech_done, cancel):
+                return
+
+    def hand_off(self, output, chunk):
+        try:
+            return output(chunk)
+        except Exception as e:
+            logging.error(f"Error delivering output: {e}")
+            return None
+
+    def get_metrics(self):
+        with self.condition:
+            return dict(self.metrics, queue_depth=len(self.pending))
+
+    def stop(self):
+        """Stops the worker after cancelling the current message; queued messages are dropped."""
+        with self.condition:
+            self.running = False
+            self.pending.clear()
+            self.condition.notify_all()
+        self.cancel_current()
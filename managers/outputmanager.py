@@ -1,53 +1,97 @@
 # outputmanager.py
 
 import logging
-import asyncio
-from pythonosc.udp_client import SimpleUDPClient
-import edge_tts
 import queue
-import tempfile
 import threading
-import os
-import sounddevice as sd
 import soundfile as sf
-from pydub import AudioSegment
-import numpy as np
-import boto3  # Add AWS SDK for Python (Boto3)
+from .asyncworker import AsyncWorker
+from .audioplayer import AudioPlayer
+from .oscsender import OscSender
+from .ttscache import TtsCache
+from .ttsengines import create_engine
+from .ttsstream import PcmStream
+from .voicecatalog import VoiceCatalog
 
 class OutputManager:
-    def __init__(self, chatbox_ip="127.0.0.1", chatbox_port=9000, voice_engine="edge-tts", voice=None):
+    def __init__(self, chatbox_ip="127.0.0.1", chatbox_port=9000, voice_engine="edge-tts", voice=None,
+                 cache_dir="tts_cache", cache_memory_mb=64, cache_disk_mb=256, lookahead=2, output_device=None,
+                 extra_osc_endpoints=(), voice_catalog_path="voice_catalog.json"):
         self.chatbox_ip = chatbox_ip
         self.chatbox_port = chatbox_port
-        self.client = SimpleUDPClient(self.chatbox_ip, self.chatbox_port)
+        self.extra_osc_endpoints = list(extra_osc_endpoints)
+        # Chatbox messages go out on their own thread to the chatbox and every extra OSC receiver
+        self.osc_sender = OscSender(self.get_osc_endpoints())
         self.voice_engine = voice_engine
         self.voice = voice
         self.tts_queue = queue.Queue()
-        self.is_playing = False
-        self.playback_thread = None  # For managing playback thread
+        # Synthesized clips waiting to play; bounded so look-ahead memory stays small
+        self.ready_queue = queue.Queue(maxsize=max(1, lookahead))
+        # One persistent output stream per device; clips are mixed in its callback
+        self.output_device = output_device
+        self.players = {}
+        # Guards player creation and device switches, which the synthesis, playback and Tk threads all reach
+        self.players_lock = threading.Lock()
+        # Bumped by clear_speech(); work tagged with an older generation is discarded
+        self.generation = 0
+        self.tts_cache = TtsCache(
+            directory=cache_dir,
+            memory_limit=cache_memory_mb * 1024 * 1024,
+            disk_limit=cache_disk_mb * 1024 * 1024
+        )
+        # One event loop owns all async engine I/O for the lifetime of the manager
+        self.tts_io = AsyncWorker()
+        self.engines = {}  # Initialized engines by name
+        self.engines_lock = threading.Lock()
+        self.engine = None
         self.initialize_tts_engine()
+        # Voice lists for the settings window, persisted and refreshed off the UI thread
+        self.voice_catalog = VoiceCatalog(self.list_voices, path=voice_catalog_path)
+        self.voice_catalog.refresh(self.voice_engine)
+
+        # Synthesis runs ahead of playback on its own thread
+        threading.Thread(target=self.synthesis_loop, daemon=True).start()
+        threading.Thread(target=self.playback_loop, daemon=True).start()
 
     def initialize_tts_engine(self):
-        if self.voice_engine == "edge-tts":
-            pass
-        elif self.voice_engine == "aws-polly":
-            try:
-                # Initialize AWS Polly client with region
-                self.polly_client = boto3.client('polly', region_name='us-east-1')
-                # Test the connection
-                self.polly_client.describe_voices(LanguageCode='en-US')
-                logging.info("AWS Polly initialized successfully")
-            except Exception as e:
-                logging.error(f"Failed to initialize AWS Polly: {e}")
-                self.voice_engine = "edge-tts"
-                logging.info("Falling back to edge-tts")
-        else:
-            logging.error(f"Unknown voice engine: {self.voice_engine}")
+        try:
+            self.engine = self.get_engine(self.voice_engine)
+        except Exception as e:
+            logging.error(f"Failed to initialize {self.voice_engine}: {e}")
+            self.voice_engine = "edge-tts"
+            logging.info("Falling back to edge-tts")
+            self.engine = self.get_engine(self.voice_engine)
+
+    def get_engine(self, name):
+        """Returns the initialized engine registered under `name`, creating it on first use."""
+        with self.engines_lock:
+            engine = self.engines.get(name)
+            if engine is None:
+                engine = create_engine(name, self.tts_io)
+                engine.initialize()
+                self.engines[name] = engine
+            return engine
 
-    def update_settings(self, chatbox_ip, chatbox_port, voice_engine, voice):
+    def get_osc_endpoints(self):
+        """Returns the chatbox endpoint followed by the extra OSC receivers, without duplicates."""
+        endpoints = [(self.chatbox_ip, int(self.chatbox_port))]
+        for endpoint in self.extra_osc_endpoints:
+            if endpoint not in endpoints:
+                endpoints.append(endpoint)
+        return endpoints
+
+    def update_settings(self, chatbox_ip, chatbox_port, voice_engine, voice, extra_osc_endpoints=None,
+                        output_device=None):
         old_engine = self.voice_engine
+        old_endpoints = self.get_osc_endpoints()
         self.chatbox_ip = chatbox_ip
         self.chatbox_port = int(chatbox_port)
-        self.client = SimpleUDPClient(self.chatbox_ip, self.chatbox_port)
+        if extra_osc_endpoints is not None:
+            self.extra_osc_endpoints = list(extra_osc_endpoints)
+        # The sender and its socket stay up; only the target list changes, and only if it differs
+        if self.get_osc_endpoints() != old_endpoints:
+            self.osc_sender.set_endpoints(self.get_osc_endpoints())
+        if output_device is not None and output_device != self.output_device:
+            self.set_output_device(output_device)
         self.voice_engine = voice_engine
         self.voice = voice
         
@@ -57,95 +101,167 @@ class OutputManager:
             self.initialize_tts_engine()
 
     def speak_text(self, text):
-        self.tts_queue.put(text)
-        if not self.is_playing:
-            threading.Thread(target=self.tts_playback_loop, daemon=True).start()
-
-    def tts_playback_loop(self):
-        while not self.tts_queue.empty():
-            text = self.tts_queue.get()
-            if self.voice_engine == "edge-tts":
-                asyncio.run(self.generate_and_play_audio_edge(text))
-            elif self.voice_engine == "aws-polly":
-                self.generate_and_play_audio_polly(text)
-            else:
-                logging.error(f"Unknown voice engine: {self.voice_engine}")
+        """Queues text for speech. Returns an Event set once it has been played (or discarded)."""
+        done = threading.Event()
+        self.tts_queue.put((self.generation, text, done))
+        return done
 
-    def generate_and_play_audio_polly(self, text):
-        """Generates and plays audio using AWS Polly."""
-        logging.info("Generating speech with AWS Polly...")
-        output_file = None
-        try:
-            response = self.polly_client.synthesize_speech(
-                Text=text,
-                OutputFormat='mp3',
-                VoiceId=self.voice
-            )
-            # Save the audio stream to a temporary file
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.mp3') as tmp_file:
-                output_file = tmp_file.name
-                tmp_file.write(response['AudioStream'].read())
-            # Play the audio
-            logging.info("Playing AWS Polly audio...")
-            self.play_audio_file(output_file)
-            logging.info("AWS Polly audio playback finished.")
-        except Exception as e:
-            logging.error(f"Error during AWS Polly playback: {e}")
-        finally:
-            # Clean up temporary file
-            if output_file and os.path.exists(output_file):
+    def clear_speech(self):
+        """Discards all queued and in-flight speech and stops playback within one block."""
+        self.generation += 1
+        for pending in (self.tts_queue, self.ready_queue):
+            while True:
                 try:
-                    os.remove(output_file)
-                except Exception as e:
-                    logging.error(f"Error deleting temporary audio file: {e}")
+                    _, item, done = pending.get_nowait()
+                except queue.Empty:
+                    break
+                if isinstance(item, PcmStream):
+                    item.cancel()
+                done.set()
+        for player in self.get_players():
+            player.flush()
 
-    async def generate_and_play_audio_edge(self, text):
-        logging.info("Generating speech with Edge TTS...")
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as tmp_file:
-            output_file = tmp_file.name
+    def synthesis_loop(self):
+        """Synthesizes queued text ahead of playback.
 
-        try:
-            communicate = edge_tts.Communicate(
-                text=text, 
-                voice=self.voice
-            )
-            await communicate.save(output_file)
-            logging.info("Playing Edge TTS audio...")
-            self.play_audio_file(output_file)
-            logging.info("Edge TTS audio playback finished.")
-        except Exception as e:
-            logging.error(f"Error during Edge TTS playback: {e}")
-        finally:
-            if os.path.exists(output_file):
-                os.remove(output_file)
+        Finished clips wait in the bounded ready queue, so while one chunk plays
+        the next `lookahead` chunks are already synthesized.
+        """
+        while True:
+            generation, text, done = self.tts_queue.get()
+            if generation == self.generation:
+                self.synthesize(text, generation, done)
+            else:
+                done.set()
 
-    def play_audio_file(self, filepath):
-        """Plays an audio file using sounddevice and soundfile."""
-        try:
-            self.stop_audio()
-            if filepath.endswith('.wav'):
-                data, samplerate = sf.read(filepath)
-            elif filepath.endswith('.mp3'):
-                audio = AudioSegment.from_file(filepath, format='mp3')
-                data = np.array(audio.get_array_of_samples()).astype(np.float32) / 2**15
-                samplerate = audio.frame_rate
+    def playback_loop(self):
+        """Plays synthesized clips back to back."""
+        while True:
+            generation, clip, done = self.ready_queue.get()
+            if generation != self.generation:
+                if isinstance(clip, PcmStream):
+                    clip.cancel()
+                done.set()
+                continue
+            if isinstance(clip, PcmStream):
+                queued = self.get_player().play(clip, clip.samplerate, done)
             else:
-                logging.error(f"Unsupported audio format: {filepath}")
+                queued = self.get_player().play(*clip, done=done)
+            # Hand over the next clip as soon as this one starts, so it follows without a gap
+            queued.started.wait()
+
+    def set_output_device(self, device):
+        """Switches playback to another device; its stream opens at that device's native rate."""
+        self.clear_speech()
+        with self.players_lock:
+            self.output_device = device
+            players, self.players = self.players, {}
+        for player in players.values():
+            player.close()
+
+    def get_player(self, device=None):
+        """Returns the AudioPlayer for a device, creating it on first use."""
+        with self.players_lock:
+            device = self.output_device if device is None else device
+            player = self.players.get(device)
+            if player is None:
+                player = self.players[device] = AudioPlayer(device)
+            return player
+
+    def get_players(self):
+        with self.players_lock:
+            return list(self.players.values())
+
+    def synthesize(self, text, generation=0, done=None):
+        """Synthesizes text with the current engine and queues the result for playback.
+
+        Cached audio and non-streaming engines are queued as a complete
+        (data, samplerate) clip. A streaming engine's PcmStream is queued
+        before synthesis starts, so playback begins with the first decoded
+        block. `done` is set when the clip has been played, or right away if
+        nothing is queued.
+        """
+        done = done or threading.Event()
+        engine = self.engine
+        cache_key = self.tts_cache.make_key(engine.name, self.voice, text) if engine.cacheable else None
+        cached = self.get_cached_audio(cache_key) if cache_key else None
+        if cached is not None:
+            logging.info("Using cached TTS audio...")
+            self.ready_queue.put((generation, cached, done))  # Blocks while the look-ahead is full
+            return
+        logging.info(f"Generating speech with {engine.name}...")
+        if engine.streaming:
+            # Resampled to the device rate as it is decoded, so playback only copies
+            clip = PcmStream(engine.sample_rate, output_rate=self.get_player().samplerate)
+            self.ready_queue.put((generation, clip, done))
+            if generation != self.generation:
+                clip.cancel()  # Cleared while waiting for room in the look-ahead
+                return
+            try:
+                encoded = engine.stream(text, self.voice, clip)
+            except Exception as e:
+                logging.error(f"Error during {engine.name} synthesis: {e}")
+                clip.cancel()
+                clip.finish()
+                return
+            decoded = clip.collect()
+        else:
+            try:
+                data, samplerate, encoded = engine.synthesize(text, self.voice)
+            except Exception as e:
+                logging.error(f"Error during {engine.name} synthesis: {e}")
+                done.set()
                 return
-            self.is_playing = True
-            sd.play(data, samplerate)
-            sd.wait()
-            self.is_playing = False
+            decoded = (data, samplerate)
+            self.ready_queue.put((generation, decoded, done))
+        if cache_key and decoded is not None:
+            if encoded is not None:
+                self.tts_cache.put_file(cache_key, *encoded)
+            self.tts_cache.put_pcm(cache_key, *decoded)
+
+    def get_cached_audio(self, cache_key):
+        """Returns cached (data, samplerate) for a key, promoting disk hits to memory."""
+        cached = self.tts_cache.get_pcm(cache_key)
+        if cached is None:
+            filepath = self.tts_cache.get_file(cache_key)
+            if filepath is None:
+                return None
+            cached = self.load_audio_file(filepath)
+            if cached is None:
+                return None
+            self.tts_cache.put_pcm(cache_key, *cached)
+        return cached
+
+    def load_audio_file(self, filepath):
+        """Decodes an audio file to (data, samplerate), or None on failure."""
+        try:
+            return sf.read(filepath, dtype='float32')
         except Exception as e:
-            logging.error(f"Error playing audio file: {e}")
-            self.is_playing = False
+            logging.error(f"Error decoding audio file: {e}")
+        return None
+
+    def list_voices(self, engine_name=None):
+        """Returns the voices of an engine (default: the current one) as dicts with Name, Id and Locale."""
+        return self.get_engine(engine_name or self.voice_engine).list_voices()
+
+    def get_playback_stats(self):
+        """Returns clip and underrun counters for each output device."""
+        with self.players_lock:
+            players = dict(self.players)
+        return {device: player.get_stats() for device, player in players.items()}
+
+    def close(self):
+        """Stops playback and shuts down the output streams and engine event loop."""
+        for player in self.get_players():
+            player.close()
+        self.tts_io.stop()
+        self.osc_sender.close()
 
     def stop_audio(self):
         """Stops audio playback."""
-        if self.is_playing:
-            sd.stop()
-            self.is_playing = False
+        for player in self.get_players():
+            player.skip()
 
     def send_to_chatbox(self, text):
         logging.info(f"Sending to chatbox: {text}")
-        self.client.send_message("/chatbox/input", [text, True])
+        self.osc_sender.send("/chatbox/input", [text, True])
@@ -0,0 +1,88 @@
+# resampler.py
+
+import functools
+import math
+
+import numpy as np
+from scipy.signal import firwin
+
+# Outputs computed per pass; bounds the gathered window and filter matrices to this many rows
+BLOCK_OUTPUTS = 4096
+
+@functools.lru_cache(maxsize=16)
+def design_filter(up, down):
+    """Returns the polyphase filter bank for an up/down ratio, shape (up, taps per phase).
+
+    Same low-pass design as scipy.signal.resample_poly (Kaiser window,
+    beta 5, 10 zero crossings per side), split into `up` phases and reversed
+    so each output sample is a dot product with a window of input samples.
+    Cached, so each rate pair is designed only once per process.
+    """
+    max_rate = max(up, down)
+    half_len = 10 * max_rate
+    h = firwin(2 * half_len + 1, 1.0 / max_rate, window=('kaiser', 5.0)) * up
+    taps = -(-len(h) // up)  # Ceiling division
+    h = np.concatenate([h, np.zeros(taps * up - len(h))])
+    bank = h.reshape(taps, up).T[:, ::-1]
+    return np.ascontiguousarray(bank, dtype=np.float32)
+
+class Resampler:
+    """Streaming polyphase resampler for mono float32 audio.
+
+    process() can be fed arbitrarily sized blocks and keeps the filter state
+    between them, so block boundaries are seamless; flush() returns the tail
+    held back by the filter delay. Output is float32.
+    """
+
+    def __init__(self, src_rate, dst_rate):
+        self.src_rate = int(src_rate)
+        self.dst_rate = int(dst_rate)
+        divisor = math.gcd(self.src_rate, self.dst_rate)
+        self.up = self.dst_rate // divisor
+        self.down = self.src_rate // divisor
+        self.bank = design_filter(self.up, self.down)
+        self.taps = self.bank.shape[1]
+        self.history = np.zeros(self.taps - 1, dtype=np.float32)
+        self.consumed = 0  # Input samples seen so far
+        self.produced = 0  # Output samples produced so far
+        # Half the filter length on the upsampled grid; sampling that far ahead cancels the filter delay
+        self.offset = 10 * max(self.up, self.down)
+
+    def process(self, block):
+        block = np.asarray(block, dtype=np.float32).ravel()
+        if self.up == self.down:
+            return block
+        buffer = np.concatenate([self.history, block])
+        self.consumed += len(block)
+        # Output n uses input index (n * down + offset) // up, which must already have arrived
+        end = max(self.produced, -(-(self.consumed * self.up - self.offset) // self.down))
+        n = np.arange(self.produced, end, dtype=np.int64)
+        self.produced = end
+        self.history = buffer[len(buffer) - (self.taps - 1):]
+        if len(n) == 0:
+            return np.zeros(0, dtype=np.float32)
+        t = n * self.down + self.offset
+        phases = t % self.up
+        # Row of the window view whose last sample is input index t // up
+        rows = t // self.up - (self.consumed - len(block))
+        view = np.lib.stride_tricks.sliding_window_view(buffer, self.taps)
+        out = np.empty(len(n), dtype=np.float32)
+        for start in range(0, len(n), BLOCK_OUTPUTS):
+            stop = start + BLOCK_OUTPUTS
+            out[start:stop] = np.einsum('ij,ij->i', view[rows[start:stop]], self.bank[phases[start:stop]])
+        return out
+
+    def flush(self):
+        """Pushes the samples still inside the filter out, up to the exact length of the input."""
+        if self.up == self.down:
+            return np.zeros(0, dtype=np.float32)
+        remaining = -(-self.consumed * self.up // self.down) - self.produced
+        return self.process(np.zeros(self.taps, dtype=np.float32))[:max(0, remaining)]
+
+def resample(data, src_rate, dst_rate):
+    """Resamples a complete mono float32 clip in one pass."""
+    data = np.asarray(data, dtype=np.float32)
+    if int(src_rate) == int(dst_rate):
+        return data
+    resampler = Resampler(src_rate, dst_rate)
+    return np.concatenate([resampler.process(data), resampler.flush()])
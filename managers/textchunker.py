@@ -0,0 +1,119 @@
+# textchunker.py
+
+import re
+
+# Characters outside the Basic Multilingual Plane take two UTF-16 code units
+ASTRAL = re.compile('[\U00010000-\U0010FFFF]')
+# Whitespace after a sentence-ending punctuation mark
+SENTENCE_BREAK = re.compile(r'(?<=[.!?])\s+')
+
+def utf16_length(text):
+    """Length of text in UTF-16 code units, which is how the chatbox counts its limit."""
+    return len(text) + len(ASTRAL.findall(text))
+
+def hard_split(word, max_length):
+    """Cuts a word longer than max_length into pieces of at most max_length units."""
+    if len(word) == utf16_length(word):
+        return [word[i:i + max_length] for i in range(0, len(word), max_length)]
+    pieces = []
+    start = units = 0
+    for i, char in enumerate(word):
+        width = 2 if ord(char) > 0xFFFF else 1
+        if units + width > max_length:
+            pieces.append(word[start:i])
+            start, units = i, 0
+        units += width
+    pieces.append(word[start:])
+    return pieces
+
+class TextChunker:
+    """Splits text into chunks of at most max_length UTF-16 units while it is still arriving.
+
+    Whole sentences are packed into a chunk while they fit; a sentence that
+    does not fit starts a new chunk, and one longer than a chunk is split
+    between words. Words longer than a chunk are cut. Whitespace between
+    words is collapsed to single spaces.
+
+    feed() and close() are generators yielding each chunk as soon as it is
+    known to be complete; exhaust each before calling the next.
+    """
+
+    def __init__(self, max_length=144):
+        self.max_length = max_length
+        self.tail = ''  # Last word of the input so far, which the next feed may continue
+        self.chunk = []  # Finished sentences of the current chunk
+        self.chunk_length = 0
+        self.sentence = []  # Words of the sentence being read
+        self.sentence_length = 0
+
+    def feed(self, text):
+        """Adds text and yields the chunks it completes."""
+        text = self.tail + text
+        # The last word may continue in the next feed unless whitespace follows it
+        self.tail = '' if not text or text[-1].isspace() else text.rsplit(None, 1)[-1]
+        end = len(text) - len(self.tail)
+        start = 0
+        for match in SENTENCE_BREAK.finditer(text, 0, end):
+            yield from self.add_sentence(text[start:match.start()])
+            self.end_sentence()
+            start = match.end()
+        yield from self.add_sentence(text[start:end])
+
+    def close(self):
+        """Yields the remaining chunks once the text is complete."""
+        if self.tail:
+            yield from self.add_sentence(self.tail)
+            self.tail = ''
+        self.end_sentence()
+        if self.chunk:
+            yield ' '.join(self.chunk)
+            self.chunk, self.chunk_length = [], 0
+
+    def add_sentence(self, text):
+        """Adds (part of) a sentence, yielding the chunks it completes."""
+        words = text.split()
+        if not words:
+            return
+        max_length = self.max_length
+        text = ' '.join(words)
+        astral = ASTRAL.search(text) is not None
+        length = utf16_length(text) if astral else len(text)
+        sentence_length = self.sentence_length + length + (1 if self.sentence else 0)
+        if self.chunk and self.chunk_length + 1 + sentence_length > max_length:
+            # The sentence no longer fits behind the finished ones
+            yield ' '.join(self.chunk)
+            self.chunk, self.chunk_length = [], 0
+        if sentence_length <= max_length:
+            self.sentence.append(text)
+            self.sentence_length = sentence_length
+            return
+        # Nor on its own: split it between words, cutting words longer than a chunk
+        line, line_length = self.sentence, self.sentence_length
+        for word in words:
+            length = utf16_length(word) if astral else len(word)
+            if length > max_length:
+                *pieces, word = hard_split(word, max_length)
+                for piece in pieces:
+                    if line:
+                        yield ' '.join(line)
+                    yield piece
+                    line, line_length = [], 0
+                length = utf16_length(word)
+            if line and line_length + 1 + length > max_length:
+                yield ' '.join(line)
+                line, line_length = [], 0
+            line_length += length + (1 if line else 0)
+            line.append(word)
+        self.sentence, self.sentence_length = line, line_length
+
+    def end_sentence(self):
+        if self.sentence:
+            self.chunk.append(' '.join(self.sentence))
+            self.chunk_length += (1 if self.chunk_length else 0) + self.sentence_length
+            self.sentence, self.sentence_length = [], 0
+
+def split_text(text, max_length=144):
+    """Yields the chunks of a complete text; see TextChunker."""
+    chunker = TextChunker(max_length)
+    yield from chunker.feed(text)
+    yield from chunker.close()
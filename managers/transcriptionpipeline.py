@@ -0,0 +1,139 @@
+# transcriptionpipeline.py
+
+import logging
+import queue
+import threading
+import time
+
+class SegmentDropped(Exception):
+    """Raised by `transcribe` when a segment's audio is no longer available."""
+
+class TranscriptionPipeline:
+    """Decouples capture from transcription with a bounded segment queue.
+
+    Capture threads call `submit` with finished utterances tagged with their
+    source device; a pool of worker threads transcribes them and results are
+    handed to `on_result(text, source)` in submission order. When
+    transcription falls behind and the queue is full, the oldest pending
+    segment is dropped so output stays close to real time.
+    """
+
+    def __init__(self, transcribe, on_result, max_pending=4, workers=1):
+        self.transcribe = transcribe
+        self.on_result = on_result
+        self.segments = queue.Queue(maxsize=max_pending)
+        self.lock = threading.Lock()
+        self.emit_lock = threading.Lock()  # Keeps on_result calls in order across workers
+        self.next_sequence = 0
+        # Reorder buffer: results finished out of order wait here until their turn
+        self.completed = {}
+        self.next_to_emit = 0
+        self.metrics = {
+            'submitted': 0,
+            'transcribed': 0,
+            'dropped': 0,
+            'queue_depth': 0,
+            'max_queue_depth': 0,
+        }
+        self.running = True
+        self.workers = [
+            threading.Thread(target=self.worker_loop, daemon=True)
+            for _ in range(max(1, workers))
+        ]
+        for worker in self.workers:
+            worker.start()
+
+    def submit(self, segment, source=None):
+        """Queues a finished utterance for transcription without blocking the caller."""
+        with self.lock:
+            sequence = self.next_sequence
+            self.next_sequence += 1
+            self.metrics['submitted'] += 1
+            item = (sequence, time.monotonic(), segment, source)
+            while True:
+                try:
+                    self.segments.put_nowait(item)
+                    break
+                except queue.Full:
+                    try:
+                        dropped_sequence, _, _, dropped_source = self.segments.get_nowait()
+                        self.segments.task_done()
+                    except queue.Empty:
+                        continue
+                    self.metrics['dropped'] += 1
+                    self._complete(dropped_sequence, None, dropped_source)
+                    logging.warning(
+                        f"Transcription is behind real time; dropped segment {dropped_sequence} "
+                        f"from {dropped_source} ({self.metrics['dropped']} dropped so far)"
+                    )
+            depth = self.segments.qsize()
+            self.metrics['queue_depth'] = depth
+            self.metrics['max_queue_depth'] = max(self.metrics['max_queue_depth'], depth)
+            ready = self._pop_ready()
+            self.emit_lock.acquire()
+        if depth > 1:
+            logging.info(f"Transcription queue depth: {depth}")
+        self._emit(ready)
+
+    def worker_loop(self):
+        """Transcribes queued segments; results are released in submission order."""
+        while self.running:
+            try:
+                sequence, queued_at, segment, source = self.segments.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            text = None
+            dropped = False
+            try:
+                wait_time = time.monotonic() - queued_at
+                text = self.transcribe(segment)
+                logging.info(f"Segment {sequence} from {source} transcribed after waiting {wait_time:.2f}s in queue")
+            except SegmentDropped as e:
+                dropped = True
+                logging.warning(f"Dropped segment {sequence} from {source}: {e}")
+            except Exception as e:
+                logging.error(f"Error in transcription worker: {e}")
+            finally:
+                self.segments.task_done()
+            with self.lock:
+                self.metrics['dropped' if dropped else 'transcribed'] += 1
+                self.metrics['queue_depth'] = self.segments.qsize()
+                self._complete(sequence, text, source)
+                ready = self._pop_ready()
+                self.emit_lock.acquire()
+            self._emit(ready)
+
+    def _complete(self, sequence, text, source):
+        """Records a finished (or dropped, text None) segment. Call with the lock held."""
+        self.completed[sequence] = (text, source)
+
+    def _pop_ready(self):
+        """Removes and returns the results that are next in order. Call with the lock held."""
+        ready = []
+        while self.next_to_emit in self.completed:
+            ready.append(self.completed.pop(self.next_to_emit))
+            self.next_to_emit += 1
+        return ready
+
+    def _emit(self, ready):
+        """Delivers popped results. Call with emit_lock acquired; it is released here."""
+        try:
+            for text, source in ready:
+                try:
+                    self.on_result(text, source)
+                except Exception as e:
+                    logging.error(f"Error handling transcription result: {e}")
+        finally:
+            self.emit_lock.release()
+
+    def get_metrics(self):
+        """Returns a snapshot of the pipeline counters."""
+        with self.lock:
+            self.metrics['queue_depth'] = self.segments.qsize()
+            return dict(self.metrics)
+
+    def stop(self):
+        """Stops the worker threads; pending segments are discarded."""
+        self.running = False
+        for worker in self.workers:
+            worker.join(timeout=1.0)
@@ -0,0 +1,136 @@
+# ttscache.py
+
+import collections
+import hashlib
+import logging
+import os
+import re
+import threading
+import unicodedata
+
+class TtsCache:
+    """Two-tier cache of synthesized speech.
+
+    Entries are keyed by engine, voice and normalized text. The memory tier
+    holds decoded PCM ready for playback; the disk tier holds the compressed
+    audio exactly as the engine returned it. Both tiers are size-bounded and
+    evict least recently used entries first.
+    """
+
+    def __init__(self, directory='tts_cache', memory_limit=64 * 1024 * 1024, disk_limit=256 * 1024 * 1024):
+        self.directory = directory
+        self.memory_limit = memory_limit
+        self.disk_limit = disk_limit
+        self.lock = threading.Lock()
+        self.memory = collections.OrderedDict()  # key -> (data, samplerate)
+        self.memory_size = 0
+        self.disk = collections.OrderedDict()  # key -> (path, size)
+        self.disk_size = 0
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0}
+        self.load_disk_index()
+
+    @staticmethod
+    def normalize_text(text):
+        """Collapses whitespace and Unicode variants that do not change the spoken result."""
+        return re.sub(r'\s+', ' ', unicodedata.normalize('NFC', text)).strip()
+
+    @classmethod
+    def make_key(cls, engine, voice, text):
+        payload = '\0'.join([engine or '', voice or '', cls.normalize_text(text)])
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def load_disk_index(self):
+        """Indexes existing cache files, oldest access first."""
+        if self.disk_limit <= 0:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            entries = []
+            for name in os.listdir(self.directory):
+                path = os.path.join(self.directory, name)
+                if os.path.isfile(path):
+                    stat = os.stat(path)
+                    entries.append((stat.st_mtime, os.path.splitext(name)[0], path, stat.st_size))
+            for _, key, path, size in sorted(entries):
+                self.disk[key] = (path, size)
+                self.disk_size += size
+            logging.info(f"TTS cache: {len(self.disk)} entries ({self.disk_size / 1024 / 1024:.1f} MB) on disk")
+        except Exception as e:
+            logging.error(f"Failed to index TTS cache: {e}")
+
+    def get_pcm(self, key):
+        """Returns cached (data, samplerate) from memory, or None."""
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                self.memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+            return entry
+
+    def get_file(self, key):
+        """Returns the path of the cached compressed audio, or None (counted as a miss)."""
+        with self.lock:
+            entry = self.disk.get(key)
+            if entry is None or not os.path.exists(entry[0]):
+                self.stats['misses'] += 1
+                return None
+            self.disk.move_to_end(key)
+            self.stats['disk_hits'] += 1
+        try:
+            os.utime(entry[0])  # Keeps LRU order across restarts
+        except OSError:
+            pass
+        return entry[0]
+
+    def put_pcm(self, key, data, samplerate):
+        """Stores decoded audio in the memory tier."""
+        size = data.nbytes
+        if size > self.memory_limit:
+            return
+        with self.lock:
+            if key in self.memory:
+                self.memory_size -= self.memory.pop(key)[0].nbytes
+            self.memory[key] = (data, samplerate)
+            self.memory_size += size
+            while self.memory_size > self.memory_limit:
+                _, (evicted, _) = self.memory.popitem(last=False)
+                self.memory_size -= evicted.nbytes
+
+    def put_file(self, key, audio_bytes, extension):
+        """Stores compressed audio in the disk tier."""
+        size = len(audio_bytes)
+        if self.disk_limit <= 0 or size > self.disk_limit:
+            return
+        path = os.path.join(self.directory, f"{key}.{extension}")
+        try:
+            with open(path, 'wb') as f:
+                f.write(audio_bytes)
+        except Exception as e:
+            logging.error(f"Failed to write TTS cache entry: {e}")
+            return
+        evicted = []
+        with self.lock:
+            if key in self.disk:
+                self.disk_size -= self.disk.pop(key)[1]
+            self.disk[key] = (path, size)
+            self.disk_size += size
+            while self.disk_size > self.disk_limit:
+                _, (evicted_path, evicted_size) = self.disk.popitem(last=False)
+                self.disk_size -= evicted_size
+                evicted.append(evicted_path)
+        for evicted_path in evicted:
+            try:
+                os.remove(evicted_path)
+            except OSError as e:
+                logging.error(f"Failed to evict TTS cache entry: {e}")
+
+    def get_stats(self):
+        """Returns hit/miss counters and tier sizes."""
+        with self.lock:
+            return dict(
+                self.stats,
+                memory_entries=len(self.memory),
+                memory_bytes=self.memory_size,
+                disk_entries=len(self.disk),
+                disk_bytes=self.disk_size,
+            )
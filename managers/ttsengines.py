@@ -0,0 +1,294 @@
+# ttsengines.py
+
+import locale
+import logging
+import sys
+import threading
+import time
+import zlib
+
+import boto3
+import edge_tts
+import numpy as np
+from botocore.config import Config
+
+from .ttsstream import EDGE_SAMPLE_RATE, encode_pcm16_flac, stream_mp3_chunks
+
+class TtsEngine:
+    """Base class for text-to-speech engines.
+
+    Subclasses set `name` and the `sample_rate` they produce. Streaming
+    engines (`streaming = True`) implement `stream`, filling a PcmStream as
+    audio arrives; the others implement `synthesize`, returning a complete
+    clip. Both also return the compressed audio as (bytes, extension) for the
+    disk cache, or None. `list_voices` returns dicts with 'Name' (shown in the
+    UI), 'Id' (passed back as `voice`) and 'Locale'. Async work runs on the
+    shared AsyncWorker `io`. Engines with `user_selectable = False` exist for
+    tests and benchmarks and are not offered in Settings.
+    """
+    name = None
+    sample_rate = 24000
+    streaming = False
+    cacheable = True
+    user_selectable = True
+
+    def __init__(self, io):
+        self.io = io
+
+    @classmethod
+    def available(cls):
+        """Whether the engine can work on this platform at all."""
+        return True
+
+    def initialize(self):
+        """Checks that the engine is usable; raises if it is not."""
+
+    def synthesize(self, text, voice):
+        """Returns (float32 data, samplerate, encoded)."""
+        raise NotImplementedError
+
+    def stream(self, text, voice, clip):
+        """Fills `clip` as audio arrives and finishes it; returns encoded audio or None."""
+        raise NotImplementedError
+
+    def list_voices(self):
+        raise NotImplementedError
+
+class EdgeTtsEngine(TtsEngine):
+    """Microsoft Edge online voices, streamed and decoded as the MP3 packets arrive."""
+    name = 'edge-tts'
+    sample_rate = EDGE_SAMPLE_RATE
+    streaming = True
+
+    def stream(self, text, voice, clip):
+        return self.io.run(self.generate(text, voice, clip))
+
+    async def generate(self, text, voice, clip):
+        communicate = edge_tts.Communicate(text=text, voice=voice)
+        audio_bytes = await stream_mp3_chunks(communicate.stream(), clip)
+        return (audio_bytes, 'mp3') if clip.complete else None
+
+    def list_voices(self):
+        voices = self.io.run(edge_tts.list_voices())
+        return [
+            {'Name': voice['FriendlyName'], 'Id': voice['ShortName'], 'Locale': voice['Locale']}
+            for voice in voices
+        ]
+
+_polly_clients = {}
+_polly_clients_lock = threading.Lock()
+
+def get_polly_client(region='us-east-1'):
+    """Returns the process-wide Polly client for a region.
+
+    boto3 clients are thread-safe and keep a pool of HTTPS connections, so a
+    single client serves synthesis on the output thread and voice listing
+    from the settings window.
+    """
+    with _polly_clients_lock:
+        client = _polly_clients.get(region)
+        if client is None:
+            client = _polly_clients[region] = boto3.client(
+                'polly',
+                region_name=region,
+                config=Config(
+                    max_pool_connections=4,
+                    connect_timeout=5,
+                    read_timeout=15,
+                    retries={'max_attempts': 2, 'mode': 'standard'}
+                )
+            )
+        return client
+
+class PollyEngine(TtsEngine):
+    """AWS Polly neural voices, requested as raw PCM and played while the response is read.
+
+    Pass `client` (e.g. one wrapped in a botocore Stubber) to use it instead
+    of the shared client.
+    """
+    name = 'aws-polly'
+    sample_rate = 16000  # Highest rate Polly offers for PCM
+    streaming = True
+    read_size = 3200  # 100 ms of 16-bit audio
+
+    def __init__(self, io, client=None):
+        super().__init__(io)
+        self.client = client
+
+    def initialize(self):
+        if self.client is None:
+            self.client = get_polly_client()
+        # Test the connection
+        self.client.describe_voices(LanguageCode='en-US')
+        logging.info("AWS Polly initialized successfully")
+
+    def stream(self, text, voice, clip):
+        response = self.client.synthesize_speech(
+            Text=text,
+            OutputFormat='pcm',
+            SampleRate=str(self.sample_rate),
+            VoiceId=voice,
+            Engine='neural'
+        )
+        body = response['AudioStream']
+        blocks = []
+        pending = b''  # A sample may straddle two chunks
+        try:
+            for chunk in body.iter_chunks(self.read_size):
+                if clip.cancelled.is_set():
+                    break
+                chunk = pending + chunk
+                usable = len(chunk) - len(chunk) % 2
+                pending = chunk[usable:]
+                if usable:
+                    blocks.append(chunk[:usable])
+                    samples = np.frombuffer(chunk, dtype='<i2', count=usable // 2)
+                    clip.put(np.multiply(samples, 1.0 / 32768.0, dtype=np.float32))
+        finally:
+            body.close()
+            clip.finish()
+        if not clip.complete:
+            return None
+        # Raw PCM is large; the disk cache keeps it as FLAC
+        return encode_pcm16_flac(b''.join(blocks), self.sample_rate), 'flac'
+
+    def list_voices(self):
+        voices = []
+        paginator = self.client.get_paginator('describe_voices')
+        for page in paginator.paginate():
+            for voice in page['Voices']:
+                # Only include Neural voices
+                if voice['SupportedEngines'] == ['neural']:
+                    voices.append({
+                        'Name': f"{voice['Name']} (Neural)",
+                        'Id': voice['Id'],
+                        'Locale': voice['LanguageCode']
+                    })
+        return voices
+
+class LocalSapiEngine(TtsEngine):
+    """Windows SAPI 5 voices installed on this machine, rendered in memory with no network round trip."""
+    name = 'local-sapi'
+    sample_rate = 24000
+    AUDIO_FORMAT = 26  # SAFT24kHz16BitMono
+    SPEAK_FLAGS = 16  # SVSFIsNotXML: speak '<' and '&' literally
+
+    def __init__(self, io):
+        super().__init__(io)
+        # SAPI objects are apartment-threaded, so every thread gets its own
+        self.local = threading.local()
+
+    @classmethod
+    def available(cls):
+        return sys.platform == 'win32'
+
+    def initialize(self):
+        if not self.available():
+            raise RuntimeError("SAPI voices are only available on Windows")
+        self.get_voice()
+
+    def get_voice(self):
+        sp_voice = getattr(self.local, 'voice', None)
+        if sp_voice is None:
+            import pythoncom
+            import win32com.client
+            pythoncom.CoInitialize()
+            sp_voice = win32com.client.Dispatch("SAPI.SpVoice")
+            self.local.voice = sp_voice
+            self.local.voice_id = None
+        return sp_voice
+
+    def synthesize(self, text, voice):
+        import win32com.client
+        sp_voice = self.get_voice()
+        if voice and voice != self.local.voice_id:
+            for token in sp_voice.GetVoices():
+                if token.Id == voice:
+                    sp_voice.Voice = token
+                    self.local.voice_id = voice
+                    break
+        audio_format = win32com.client.Dispatch("SAPI.SpAudioFormat")
+        audio_format.Type = self.AUDIO_FORMAT
+        stream = win32com.client.Dispatch("SAPI.SpMemoryStream")
+        stream.Format = audio_format
+        sp_voice.AudioOutputStream = stream
+        sp_voice.Speak(text, self.SPEAK_FLAGS)
+        pcm = np.frombuffer(bytes(stream.GetData()), dtype=np.int16)
+        return np.multiply(pcm, 1.0 / 32768.0, dtype=np.float32), self.sample_rate, None
+
+    def list_voices(self):
+        voices = []
+        for token in self.get_voice().GetVoices():
+            try:
+                lcid = int(token.GetAttribute("Language").split(';')[0], 16)
+                voice_locale = locale.windows_locale.get(lcid, 'en_US').replace('_', '-')
+            except Exception:
+                voice_locale = 'en-US'
+            voices.append({'Name': token.GetDescription(), 'Id': token.Id, 'Locale': voice_locale})
+        return voices
+
+class FakeToneEngine(TtsEngine):
+    """Deterministic sine tones for testing and benchmarking the output path offline.
+
+    Each text maps to a fixed pitch and lasts `seconds_per_char` per
+    character, so durations scale with the text like real speech.
+    """
+    name = 'fake-tone'
+    sample_rate = 24000
+    cacheable = False
+    user_selectable = False
+    seconds_per_char = 0.06
+
+    def render(self, text):
+        duration = max(0.1, len(text) * self.seconds_per_char)
+        frequency = 220.0 + zlib.crc32(text.encode('utf-8')) % 660
+        t = np.arange(int(duration * self.sample_rate), dtype=np.float32) / self.sample_rate
+        data = 0.2 * np.sin(2 * np.pi * frequency * t, dtype=np.float32)
+        fade = min(len(data) // 2, self.sample_rate // 100)
+        if fade:
+            ramp = np.linspace(0.0, 1.0, fade, dtype=np.float32)
+            data[:fade] *= ramp
+            data[-fade:] *= ramp[::-1]
+        return data
+
+    def synthesize(self, text, voice):
+        return self.render(text), self.sample_rate, None
+
+    def list_voices(self):
+        return [{'Name': 'Test Tone', 'Id': 'tone', 'Locale': 'en-US'}]
+
+class FakeStreamingToneEngine(FakeToneEngine):
+    """FakeToneEngine delivered in blocks, optionally at a fixed real-time rate, to exercise streaming playback."""
+    name = 'fake-tone-stream'
+    streaming = True
+    block_seconds = 0.1
+    realtime_factor = 0.0  # Seconds spent producing each second of audio; 0 delivers at once
+
+    def stream(self, text, voice, clip):
+        data = self.render(text)
+        block = int(self.block_seconds * self.sample_rate)
+        try:
+            for start in range(0, len(data), block):
+                if clip.cancelled.is_set():
+                    break
+                if self.realtime_factor:
+                    time.sleep(self.block_seconds * self.realtime_factor)
+                clip.put(data[start:start + block])
+        finally:
+            clip.finish()
+        return None
+
+TTS_ENGINES = {
+    engine.name: engine
+    for engine in (EdgeTtsEngine, PollyEngine, LocalSapiEngine, FakeToneEngine, FakeStreamingToneEngine)
+}
+
+def get_selectable_engines():
+    """Returns the names of the engines offered in Settings on this platform."""
+    return [name for name, engine in TTS_ENGINES.items() if engine.user_selectable and engine.available()]
+
+def create_engine(name, io):
+    """Instantiates the TTS engine registered under `name`; raises ValueError if there is none."""
+    if name not in TTS_ENGINES:
+        raise ValueError(f"Unknown voice engine: {name}")
+    return TTS_ENGINES[name](io)
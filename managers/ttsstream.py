@@ -0,0 +1,214 @@
+# ttsstream.py
+
+import asyncio
+import io
+import logging
+import queue
+import shutil
+import subprocess
+import sys
+import threading
+
+import numpy as np
+import soundfile as sf
+
+from .resampler import Resampler, resample
+
+# edge-tts always returns 24 kHz mono MP3
+EDGE_SAMPLE_RATE = 24000
+FFMPEG_BINARY = 'ffmpeg'
+
+_ffmpeg_path = None
+_ffmpeg_checked = False
+
+def ffmpeg_available():
+    """Whether the ffmpeg binary is on PATH; looked up once and then remembered."""
+    global _ffmpeg_path, _ffmpeg_checked
+    if not _ffmpeg_checked:
+        _ffmpeg_path = shutil.which(FFMPEG_BINARY)
+        _ffmpeg_checked = True
+        if _ffmpeg_path is None:
+            logging.warning("ffmpeg not found on PATH; edge-tts audio plays once each clip has fully arrived")
+    return _ffmpeg_path is not None
+
+def encode_pcm16_flac(pcm, samplerate):
+    """Compresses raw little-endian 16-bit mono PCM to FLAC bytes, in memory."""
+    buffer = io.BytesIO()
+    sf.write(buffer, np.frombuffer(pcm, dtype='<i2'), samplerate, format='FLAC')
+    return buffer.getvalue()
+
+class PcmStream:
+    """Decoded audio that becomes available block by block while synthesis is still running.
+
+    The synthesis side calls put() for each float32 block and finish() at the
+    end; the playback side takes blocks from `blocks` as they arrive, up to a
+    None sentinel. All blocks are also kept so the finished clip can be cached.
+
+    With `output_rate`, blocks are resampled on the synthesis side as they are
+    put, so the consumer receives audio at the output device's rate.
+    """
+
+    def __init__(self, samplerate, channels=1, output_rate=None):
+        self.source_rate = samplerate
+        self.samplerate = output_rate or samplerate
+        self.channels = channels
+        self.resampler = Resampler(samplerate, output_rate) if output_rate and output_rate != samplerate else None
+        self.blocks = queue.Queue()
+        self.collected = []
+        self.complete = False
+        self.cancelled = threading.Event()
+
+    def put(self, block):
+        if self.cancelled.is_set():
+            return
+        if self.resampler is not None:
+            block = self.resampler.process(block)
+            if len(block) == 0:
+                return
+        self.collected.append(block)
+        self.blocks.put(block)
+
+    def finish(self):
+        if self.resampler is not None and not self.cancelled.is_set():
+            tail = self.resampler.flush()
+            if len(tail):
+                self.collected.append(tail)
+                self.blocks.put(tail)
+        self.complete = not self.cancelled.is_set()
+        self.blocks.put(None)
+
+    def cancel(self):
+        """Stops playback and synthesis of this clip."""
+        self.cancelled.set()
+        self.blocks.put(None)
+
+    def collect(self):
+        """Returns the whole clip as (data, samplerate), or None if it did not finish."""
+        if not self.complete or not self.collected:
+            return None
+        return np.concatenate(self.collected), self.samplerate
+
+class Mp3StreamDecoder:
+    """Decodes MP3 bytes incrementally by piping them through ffmpeg.
+
+    feed() can be called with arbitrarily sized pieces of the stream; decoded
+    float32 samples are passed to `on_pcm` from a reader thread as soon as
+    ffmpeg produces them.
+    """
+
+    def __init__(self, on_pcm, samplerate=EDGE_SAMPLE_RATE, channels=1, read_size=4096):
+        self.on_pcm = on_pcm
+        self.channels = channels
+        self.read_size = read_size
+        command = [
+            FFMPEG_BINARY, '-hide_banner', '-loglevel', 'error',
+            '-probesize', '32', '-f', 'mp3', '-i', 'pipe:0',
+            '-f', 'f32le', '-ac', str(channels), '-ar', str(samplerate), 'pipe:1'
+        ]
+        creationflags = subprocess.CREATE_NO_WINDOW if sys.platform == 'win32' else 0
+        self.process = subprocess.Popen(
+            command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            creationflags=creationflags
+        )
+        self.reader = threading.Thread(target=self.read_loop, daemon=True)
+        self.reader.start()
+
+    def feed(self, data):
+        self.process.stdin.write(data)
+        self.process.stdin.flush()
+
+    def read_loop(self):
+        frame_bytes = 4 * self.channels
+        pending = b''
+        try:
+            while True:
+                data = self.process.stdout.read1(self.read_size)
+                if not data:
+                    break
+                data = pending + data
+                usable = len(data) - len(data) % frame_bytes
+                pending = data[usable:]
+                if usable:
+                    # Copy out of the bytes object so the block is writable and owned
+                    self.on_pcm(np.frombuffer(data[:usable], dtype=np.float32).copy())
+        except Exception as e:
+            logging.error(f"Error reading decoded audio: {e}")
+
+    def close(self):
+        """Signals the end of the stream and waits for the remaining audio to be decoded."""
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        self.reader.join()
+        self.process.wait()
+
+    def abort(self):
+        self.process.kill()
+        self.close()
+
+class BufferedMp3Decoder:
+    """Fallback for Mp3StreamDecoder when ffmpeg is not installed.
+
+    Collects the whole MP3 stream and decodes it with soundfile on close(),
+    so the clip only starts playing once synthesis has finished.
+    """
+
+    def __init__(self, on_pcm, samplerate=EDGE_SAMPLE_RATE, channels=1):
+        self.on_pcm = on_pcm
+        self.samplerate = samplerate
+        self.channels = channels
+        self.encoded = bytearray()
+
+    def feed(self, data):
+        self.encoded += data
+
+    def close(self):
+        if not self.encoded:
+            return
+        data, samplerate = sf.read(io.BytesIO(bytes(self.encoded)), dtype='float32')
+        if data.ndim > 1 and self.channels == 1:
+            data = data.mean(axis=1)
+        if samplerate != self.samplerate:
+            data = resample(data, samplerate, self.samplerate)
+        self.on_pcm(data)
+
+    def abort(self):
+        self.encoded = bytearray()
+
+async def stream_mp3_chunks(chunks, clip, decoder_factory=None):
+    """Decodes an edge-tts style chunk stream into `clip` as the chunks arrive.
+
+    `chunks` is any async iterable of dicts like edge_tts.Communicate.stream()
+    yields; only {'type': 'audio', 'data': bytes} entries are decoded. The
+    clip is always finished, even on error. Returns the complete MP3 bytes.
+
+    Without ffmpeg the chunks are buffered and decoded at the end. Decoder
+    calls can block on the ffmpeg pipes, so they run in the loop's executor
+    rather than on the shared event loop.
+    """
+    if decoder_factory is None:
+        decoder_factory = Mp3StreamDecoder if ffmpeg_available() else BufferedMp3Decoder
+    loop = asyncio.get_running_loop()
+    decoder = await loop.run_in_executor(None, decoder_factory, clip.put, clip.source_rate, clip.channels)
+    encoded = bytearray()
+    try:
+        async for chunk in chunks:
+            if clip.cancelled.is_set():
+                await loop.run_in_executor(None, decoder.abort)
+                break
+            if chunk.get('type') == 'audio':
+                encoded += chunk['data']
+                await loop.run_in_executor(None, decoder.feed, chunk['data'])
+        else:
+            await loop.run_in_executor(None, decoder.close)
+    except BaseException:
+        clip.cancel()
+        await loop.run_in_executor(None, decoder.abort)
+        raise
+    finally:
+        clip.finish()
+    return bytes(encoded)
@@ -9,8 +9,10 @@ import re
 from spellchecker import SpellChecker
 from .inputmanager import InputManager
 from .outputmanager import OutputManager
+from .asrbackends import ASR_BACKENDS, DECODING_PROFILES, MODEL_SIZES
+from .oscsender import parse_endpoint
+from .ttsengines import get_selectable_engines
 import sounddevice as sd
-import asyncio
 import sys
 import configparser
 import os
@@ -18,7 +20,6 @@ import json
 
 # Import keyboard for global hotkey functionality
 import keyboard
-import boto3  # Add AWS SDK for Python
 from PIL import Image, ImageTk
 import tempfile
 
@@ -96,6 +97,30 @@ class UIManager:
         self.hotkey = '`'  # Default hotkey
         # Output options
         self.output_options = {'Voice Output': True, 'Chatbox Output': True}
+        # Streaming (partial) transcription options
+        self.streaming_transcription = True
+        self.partial_interval_ms = 500
+        # Speech recognition options
+        self.asr_backend = 'whisper'
+        self.asr_model = 'base'
+        self.asr_workers = 1
+        self.decoding_profile = 'balanced'
+        # Additional capture devices, separated by ';' in settings.ini
+        self.extra_input_devices = []
+        # Additional OSC receivers (host:port) that get everything sent to the chatbox
+        self.extra_osc_endpoints = []
+        # TTS cache size limits in MB
+        self.tts_cache_memory_mb = 64
+        self.tts_cache_disk_mb = 256
+        # Number of synthesized chunks kept ready while the current one plays
+        self.tts_lookahead = 2
+        # Messages that may wait for output before Send is refused
+        self.output_queue_size = 8
+        # Chatbox pacing: reading speed, minimum time on screen and the send rate limit
+        self.chatbox_reading_cps = 15.0
+        self.chatbox_min_display = 2.0
+        self.chatbox_min_interval = 1.5
+        self.chatbox_burst = 1
 
         # Initialize StringVar variables for settings
         self.voice_engine_var = tk.StringVar(value=self.voice_engine)
@@ -107,8 +132,8 @@ class UIManager:
         self.chatbox_port_var = tk.StringVar(value=str(self.chatbox_port))
 
         # Initialize voice dictionaries
-        self.edge_voice_dict = {}
-        self.aws_polly_voice_dict = {}
+        self.voice_ids = {}  # Voice display name -> engine voice id for the selected engine
+        self.voices_pending = False  # True while the selected engine has no voice catalog yet
 
         # Flags
         self.is_typing = False  # Flag to detect typing
@@ -199,6 +224,27 @@ class UIManager:
             # Output options
             self.output_options['Voice Output'] = settings.getboolean('voice_output', True)
             self.output_options['Chatbox Output'] = settings.getboolean('chatbox_output', True)
+
+            self.streaming_transcription = settings.getboolean('streaming_transcription', True)
+            self.partial_interval_ms = settings.getint('partial_interval_ms', 500)
+            self.asr_backend = settings.get('asr_backend', 'whisper')
+            self.asr_model = settings.get('asr_model', 'base')
+            self.asr_workers = settings.getint('asr_workers', 1)
+            self.decoding_profile = settings.get('decoding_profile', 'balanced')
+            self.tts_cache_memory_mb = settings.getint('tts_cache_memory_mb', 64)
+            self.tts_cache_disk_mb = settings.getint('tts_cache_disk_mb', 256)
+            self.tts_lookahead = settings.getint('tts_lookahead', 2)
+            self.output_queue_size = settings.getint('output_queue_size', 8)
+            self.chatbox_reading_cps = settings.getfloat('chatbox_reading_cps', 15.0)
+            self.chatbox_min_display = settings.getfloat('chatbox_min_display', 2.0)
+            self.chatbox_min_interval = settings.getfloat('chatbox_min_interval', 1.5)
+            self.chatbox_burst = settings.getint('chatbox_burst', 1)
+            self.extra_input_devices = [
+                name.strip() for name in settings.get('extra_input_devices', '').split(';') if name.strip()
+            ]
+            self.extra_osc_endpoints = [
+                name.strip() for name in settings.get('extra_osc_endpoints', '').split(';') if name.strip()
+            ]
         else:
             # Set defaults
             self.input_device = self.get_default_input_device()
@@ -218,6 +264,22 @@ class UIManager:
             'hotkey': self.hotkey,
             'voice_output': str(self.output_options['Voice Output']),
             'chatbox_output': str(self.output_options['Chatbox Output']),
+            'streaming_transcription': str(self.streaming_transcription),
+            'partial_interval_ms': str(self.partial_interval_ms),
+            'asr_backend': self.asr_backend,
+            'asr_model': self.asr_model,
+            'asr_workers': str(self.asr_workers),
+            'decoding_profile': self.decoding_profile,
+            'tts_cache_memory_mb': str(self.tts_cache_memory_mb),
+            'tts_cache_disk_mb': str(self.tts_cache_disk_mb),
+            'tts_lookahead': str(self.tts_lookahead),
+            'output_queue_size': str(self.output_queue_size),
+            'chatbox_reading_cps': str(self.chatbox_reading_cps),
+            'chatbox_min_display': str(self.chatbox_min_display),
+            'chatbox_min_interval': str(self.chatbox_min_interval),
+            'chatbox_burst': str(self.chatbox_burst),
+            'extra_input_devices': '; '.join(self.extra_input_devices),
+            'extra_osc_endpoints': '; '.join(self.extra_osc_endpoints),
         }
         with open('settings.ini', 'w') as configfile:
             config.write(configfile)
@@ -236,6 +298,39 @@ class UIManager:
         device_info = sd.query_devices(index)
         return f"{device_info['name']} ({index})"
 
+    def get_output_device_index(self):
+        """Returns the index of the configured output device, or None for the system default."""
+        try:
+            return int(self.output_device.split('(')[-1].strip(')'))
+        except (AttributeError, ValueError):
+            logging.error(f"Invalid output device: {self.output_device}")
+            return None
+
+    def get_extra_input_devices(self):
+        """Returns (device index, label) pairs for the additional capture devices."""
+        devices = []
+        for name in self.extra_input_devices:
+            try:
+                index = int(name.split('(')[-1].strip(')'))
+            except ValueError:
+                logging.error(f"Invalid input device in extra_input_devices: {name}")
+                continue
+            if index == sd.default.device[0] or index in [d for d, _ in devices]:
+                logging.warning(f"Skipping duplicate capture device: {name}")
+                continue
+            devices.append((index, name.rsplit(' (', 1)[0]))
+        return devices
+
+    def get_extra_osc_endpoints(self):
+        """Returns (host, port) pairs for the additional OSC receivers."""
+        endpoints = []
+        for name in self.extra_osc_endpoints:
+            try:
+                endpoints.append(parse_endpoint(name))
+            except ValueError as e:
+                logging.error(f"Invalid OSC endpoint in extra_osc_endpoints: {name} ({e})")
+        return endpoints
+
     def create_widgets(self):
         """Creates the main UI."""
         # Display section at the top
@@ -265,6 +360,7 @@ class UIManager:
         self.textbox.bind('<KeyRelease>', self.check_spelling)
         self.textbox.bind('<Button-3>', self.show_suggestions)
         self.textbox.bind('<Return>', self.submit_text)
+        self.textbox.bind('<Shift-Return>', self.submit_urgent_text)
         # Add vertical scrollbar
         scrollbar = ttk.Scrollbar(text_frame, command=self.textbox.yview)
         scrollbar.pack(side='right', fill='y')
@@ -278,6 +374,7 @@ class UIManager:
         button_frame.columnconfigure(1, weight=1)
         button_frame.columnconfigure(2, weight=1)
         button_frame.columnconfigure(3, weight=1)
+        button_frame.columnconfigure(4, weight=1)
 
         cancel_button = ttk.Button(button_frame, text='Cancel', command=self.cancel_text)
         cancel_button.grid(row=0, column=0, sticky='e')
@@ -293,6 +390,10 @@ class UIManager:
         stop_audio_button = ttk.Button(button_frame, text='Stop Audio', command=self.stop_audio)
         stop_audio_button.grid(row=0, column=3, sticky='w')
 
+        # Clear Queue Button
+        clear_queue_button = ttk.Button(button_frame, text='Clear Queue', command=self.clear_output_queue)
+        clear_queue_button.grid(row=0, column=4, sticky='w')
+
     def get_current_settings_text(self):
         """Returns a string representing the current settings in the correct order."""
         output_methods = ', '.join([key for key, value in self.output_options.items() if value])
@@ -362,17 +463,24 @@ class UIManager:
         # Recheck the spelling
         self.check_spelling()
 
-    def submit_text(self, event=None):
+    def submit_text(self, event=None, urgent=False):
         """Handles the 'Send' button click or Enter key press."""
         text = self.textbox.get("1.0", tk.END).strip()
         if text:
-            self.controller.process_text(text)
-            self.textbox.delete("1.0", tk.END)
-            logging.info(f'Text submitted: {text}')
+            if self.controller.process_text(text, urgent=urgent):
+                self.textbox.delete("1.0", tk.END)
+                logging.info(f'Text submitted: {text}')
+            else:
+                # Output queue is full; keep the text so it can be sent once the queue drains
+                self.root.bell()
         else:
             logging.warning('No text entered.')
         return 'break'  # Prevent default behavior of adding a newline
 
+    def submit_urgent_text(self, event=None):
+        """Handles Shift+Enter: sends the text ahead of queued messages, interrupting the current one."""
+        return self.submit_text(event, urgent=True)
+
     def cancel_text(self):
         """Handles the 'Cancel' button click."""
         self.textbox.delete("1.0", tk.END)
@@ -389,6 +497,19 @@ class UIManager:
         else:
             self.toggle_voice_button.config(text='Start Voice Capture')
 
+    def set_asr_state(self, state):
+        """Reflects the ASR model state ('loading', 'ready' or 'failed') on the capture button."""
+        self.root.after(0, self._apply_asr_state, state)
+
+    def _apply_asr_state(self, state):
+        if state == 'loading':
+            self.toggle_voice_button.config(text='Loading ASR...', state='disabled')
+        elif state == 'ready':
+            self.toggle_voice_button.config(state='normal')
+            self.update_voice_capture_button(self.controller.voice_capture_active)
+        else:
+            self.toggle_voice_button.config(text='ASR Unavailable', state='disabled')
+
     def setup_hotkey_listener(self):
         """Sets up the hotkey listener for toggling voice capture."""
         try:
@@ -404,8 +525,38 @@ class UIManager:
         self.controller.set_typing(False)
 
     def insert_text(self, text):
-        """Inserts text into the textbox."""
-        self.textbox.insert(tk.END, text)
+        """Inserts final text into the textbox, ahead of any partial transcription."""
+        self.root.after(0, self._insert_text, text)
+
+    def _insert_text(self, text):
+        ranges = self.textbox.tag_ranges('partial')
+        self.textbox.insert(ranges[0] if ranges else tk.END, text)
+        self.textbox.see(tk.END)
+
+    def set_partial_text(self, text):
+        """Shows an unstable partial transcription at the end of the textbox."""
+        self.root.after(0, self._replace_partial, text, True)
+
+    def commit_partial_text(self, text):
+        """Replaces the partial transcription (if any) with the final text."""
+        self.root.after(0, self._replace_partial, text, False)
+
+    def clear_partial_text(self):
+        """Removes the partial transcription without inserting anything."""
+        self.root.after(0, self._replace_partial, '', False)
+
+    def _replace_partial(self, text, partial):
+        ranges = self.textbox.tag_ranges('partial')
+        if ranges:
+            self.textbox.delete(ranges[0], ranges[-1])
+        if not text:
+            return
+        if partial:
+            self.textbox.insert(tk.END, text, 'partial')
+            self.textbox.tag_config('partial', foreground='gray')
+        else:
+            self.textbox.insert(tk.END, text)
+        self.textbox.see(tk.END)
 
     def show_settings(self):
         """Displays the settings window in the correct order."""
@@ -416,6 +567,7 @@ class UIManager:
         # Create all BooleanVar variables at initialization
         self.voice_output_var = tk.BooleanVar(value=self.output_options['Voice Output'])
         self.chatbox_output_var = tk.BooleanVar(value=self.output_options['Chatbox Output'])
+        self.streaming_transcription_var = tk.BooleanVar(value=self.streaming_transcription)
 
         # Input Device
         ttk.Label(self.settings_window, text='Input Device:').grid(row=row, column=0, padx=5, pady=5, sticky='E')
@@ -435,17 +587,16 @@ class UIManager:
 
         # Engine
         ttk.Label(self.settings_window, text='Engine:').grid(row=row, column=0, padx=5, pady=5, sticky='E')
-        voice_engines = ['edge-tts', 'aws-polly']
+        voice_engines = get_selectable_engines()
         ttk.Combobox(self.settings_window, textvariable=self.voice_engine_var, values=voice_engines, state='readonly', width=50).grid(
             row=row, column=1, padx=5, pady=5, sticky='W')
-        self.voice_engine_var.trace('w', self.update_voice_options)
+        self.voice_engine_var.trace('w', self.on_engine_selected)
         row += 1
 
         # Language
         ttk.Label(self.settings_window, text='Language:').grid(row=row, column=0, padx=5, pady=5, sticky='E')
-        languages = self.get_available_languages()
-        language_combobox = ttk.Combobox(self.settings_window, textvariable=self.language_var, values=languages, state='readonly', width=50)
-        language_combobox.grid(row=row, column=1, padx=5, pady=5, sticky='W')
+        self.language_combobox = ttk.Combobox(self.settings_window, textvariable=self.language_var, state='readonly', width=50)
+        self.language_combobox.grid(row=row, column=1, padx=5, pady=5, sticky='W')
         self.language_var.trace('w', self.update_voice_options)  # Add this trace
         row += 1
 
@@ -453,7 +604,7 @@ class UIManager:
         ttk.Label(self.settings_window, text='Voice:').grid(row=row, column=0, padx=5, pady=5, sticky='E')
         self.voice_combobox = ttk.Combobox(self.settings_window, textvariable=self.voice_var, state='readonly', width=50)
         self.voice_combobox.grid(row=row, column=1, padx=5, pady=5, sticky='W')
-        self.update_voice_options()
+        self.on_engine_selected()
         row += 1
 
         # Hotkey
@@ -471,6 +622,29 @@ class UIManager:
         ttk.Checkbutton(methods_frame, text='Chatbox Output', variable=self.chatbox_output_var).pack(side='left', padx=5)
         row += 1
 
+        # Voice Input options
+        ttk.Label(self.settings_window, text='Voice Input:').grid(row=row, column=0, padx=5, pady=5, sticky='E')
+        ttk.Checkbutton(self.settings_window, text='Live Partial Transcription', variable=self.streaming_transcription_var).grid(
+            row=row, column=1, padx=5, pady=5, sticky='W')
+        row += 1
+
+        # Speech recognition backend and model size
+        ttk.Label(self.settings_window, text='ASR Backend:').grid(row=row, column=0, padx=5, pady=5, sticky='E')
+        asr_frame = ttk.Frame(self.settings_window)
+        asr_frame.grid(row=row, column=1, padx=5, pady=5, sticky='W')
+        self.asr_backend_var = tk.StringVar(value=self.asr_backend)
+        self.asr_model_var = tk.StringVar(value=self.asr_model)
+        ttk.Combobox(asr_frame, textvariable=self.asr_backend_var, values=list(ASR_BACKENDS), state='readonly', width=20).pack(side='left')
+        ttk.Combobox(asr_frame, textvariable=self.asr_model_var, values=MODEL_SIZES, state='readonly', width=10).pack(side='left', padx=5)
+        row += 1
+
+        # Decoding profile (latency vs. accuracy)
+        ttk.Label(self.settings_window, text='Decoding Profile:').grid(row=row, column=0, padx=5, pady=5, sticky='E')
+        self.decoding_profile_var = tk.StringVar(value=self.decoding_profile)
+        ttk.Combobox(self.settings_window, textvariable=self.decoding_profile_var, values=list(DECODING_PROFILES), state='readonly', width=20).grid(
+            row=row, column=1, padx=5, pady=5, sticky='W')
+        row += 1
+
         # IP and Port
         ttk.Label(self.settings_window, text='IP and Port:').grid(row=row, column=0, padx=5, pady=5, sticky='E')
         ip_port_frame = ttk.Frame(self.settings_window)
@@ -483,7 +657,9 @@ class UIManager:
         # Save and Cancel buttons
         button_frame = ttk.Frame(self.settings_window)
         button_frame.grid(row=row, column=0, columnspan=2, pady=10)
-        ttk.Button(button_frame, text='Save', command=self.save_settings).pack(side='left', padx=5)
+        self.save_button = ttk.Button(button_frame, text='Save', command=self.save_settings)
+        self.save_button.pack(side='left', padx=5)
+        self.update_save_button()
         ttk.Button(button_frame, text='Cancel', command=self.settings_window.destroy).pack(side='left', padx=5)
 
     def save_settings(self):
@@ -498,27 +674,32 @@ class UIManager:
 
             # Update sounddevice settings
             sd.default.device = (input_device_index, output_device_index)
-            
-            # Force sounddevice to use new settings
-            sd.stop()
-            
+
             self.chatbox_ip = self.chatbox_ip_var.get()
             self.chatbox_port = self.chatbox_port_var.get()
             self.voice_engine = self.voice_engine_var.get()
-            self.voice = self.voice_var.get()
+            self.voice = self.voice_var.get() or self.voice
             self.language = self.language_var.get()
             self.hotkey = self.hotkey_var.get()
 
             # Output options
             self.output_options['Voice Output'] = self.voice_output_var.get()
             self.output_options['Chatbox Output'] = self.chatbox_output_var.get()
+            self.streaming_transcription = self.streaming_transcription_var.get()
+
+            # Reload the ASR model in the background if the backend or size changed
+            asr_changed = (self.asr_backend, self.asr_model) != (self.asr_backend_var.get(), self.asr_model_var.get())
+            self.asr_backend = self.asr_backend_var.get()
+            self.asr_model = self.asr_model_var.get()
+            if asr_changed:
+                self.controller.reload_asr(self.asr_backend, self.asr_model)
+            self.decoding_profile = self.decoding_profile_var.get()
+            self.controller.input_manager.set_decoding_profile(self.decoding_profile, self.language)
 
             # Apply the settings
             sd.default.device = (input_device_index, output_device_index)
-            if self.voice_engine == 'edge-tts':
-                self.voice = self.edge_voice_dict.get(self.voice, self.voice)
-            elif self.voice_engine == 'aws-polly':
-                self.voice = self.aws_polly_voice_dict.get(self.voice, self.voice)
+            self.controller.input_manager.set_primary_device(input_device_index)
+            self.voice = self.voice_ids.get(self.voice, self.voice)
 
             # Update the OutputManager via the controller
             self.controller.output_manager.update_settings(
@@ -526,6 +707,8 @@ class UIManager:
                 chatbox_port=self.chatbox_port,
                 voice_engine=self.voice_engine,
                 voice=self.voice,
+                extra_osc_endpoints=self.get_extra_osc_endpoints(),
+                output_device=output_device_index
             )
 
             # Update the current settings label
@@ -544,78 +727,62 @@ class UIManager:
             logging.error(f"Error saving settings: {e}")
             messagebox.showerror("Error", f"Failed to save settings: {str(e)}")
 
+    def on_engine_selected(self, *args):
+        """Shows the cached voices of the selected engine and refreshes them in the background if stale."""
+        self.update_language_options()
+        self.update_voice_options()
+        self.controller.output_manager.voice_catalog.refresh(self.voice_engine_var.get())
+
+    def on_voice_catalog_update(self, engine_name):
+        """Called from the catalog's refresh thread; redraws the voice lists on the Tk thread."""
+        self.root.after(0, self._apply_voice_catalog_update, engine_name)
+
+    def _apply_voice_catalog_update(self, engine_name):
+        settings_window = getattr(self, 'settings_window', None)
+        if settings_window is None or not settings_window.winfo_exists():
+            return
+        if engine_name == self.voice_engine_var.get():
+            self.update_language_options()
+            self.update_voice_options()
+
+    def update_save_button(self):
+        """Disables Save while the selected engine's voices are still being fetched."""
+        save_button = getattr(self, 'save_button', None)
+        if save_button is not None and save_button.winfo_exists():
+            save_button.state(['disabled'] if self.voices_pending else ['!disabled'])
+
+    def update_language_options(self):
+        """Updates the language options for the selected engine."""
+        self.language_combobox['values'] = self.get_available_languages()
+
     def update_voice_options(self, *args):
         """Updates the voice options based on the selected engine and language."""
         try:
             selected_engine = self.voice_engine_var.get()
             selected_language = self.language_var.get()
-            
-            if selected_engine == 'edge-tts':
-                voices = self.get_edge_tts_voices(selected_language)
-            elif selected_engine == 'aws-polly':
-                voices = self.get_aws_polly_voices(selected_language)
-            else:
-                voices = []
-                
+            voices = self.get_engine_voices(selected_engine, selected_language)
+
             self.voice_combobox['values'] = voices
+            # Until the engine's catalog arrives keep the current voice; it only suits the engine in use
+            self.voices_pending = not voices and selected_engine != self.voice_engine
+            self.update_save_button()
             # Only set to first voice if current selection is invalid
-            if not self.voice_var.get() or self.voice_var.get() not in voices:
-                self.voice_var.set(voices[0] if voices else '')
-                
+            if voices and self.voice_var.get() not in voices:
+                self.voice_var.set(voices[0])
+
         except Exception as e:
             logging.error(f"Error updating voice options: {e}")
 
     def get_available_languages(self):
         """Returns a list of available languages for the selected voice engine."""
-        selected_engine = self.voice_engine_var.get()
-        if (selected_engine == 'edge-tts'):
-            voices = self.get_all_edge_tts_voices()
-            languages = set()
-            for voice in voices:
-                # Only include English languages
-                if voice['Locale'].startswith('en-'):
-                    languages.add(voice['Locale'])
-            return sorted(languages)
-        elif selected_engine == 'aws-polly':
-            return ['en-US', 'en-GB', 'en-AU', 'en-IN']  # Restrict to English variants
-        else:
-            return []
-
-    def get_all_edge_tts_voices(self):
-        """Retrieves all voices from edge-tts."""
-        import edge_tts
-        voices = asyncio.run(edge_tts.list_voices())
-        return voices
-
-    def get_edge_tts_voices(self, selected_language):
-        """Returns a list of available voices for Edge TTS given a language."""
-        voices = self.get_all_edge_tts_voices()
-        voice_names = []
-        self.edge_voice_dict = {}
-        for voice in voices:
-            if voice['Locale'] == selected_language:
-                voice_names.append(voice['FriendlyName'])
-                self.edge_voice_dict[voice['FriendlyName']] = voice['ShortName']
-        return voice_names
-
-    def get_aws_polly_voices(self, selected_language):
-        """Returns a list of available voices for AWS Polly given a language."""
-        try:
-            polly_client = boto3.client('polly', region_name='us-east-1')
-            response = polly_client.describe_voices(LanguageCode=selected_language)
-            voices = response['Voices']
-            voice_names = []
-            self.aws_polly_voice_dict = {}
-            for voice in voices:
-                # Only include Neural voices
-                if voice['SupportedEngines'] == ['neural']:
-                    name = f"{voice['Name']} (Neural)"
-                    voice_names.append(name)
-                    self.aws_polly_voice_dict[name] = voice['Id']
-            return sorted(voice_names)
-        except Exception as e:
-            logging.error(f"Error getting AWS Polly voices: {e}")
-            return []
+        # Only include English languages
+        return self.controller.output_manager.voice_catalog.get_locales(self.voice_engine_var.get(), prefix='en-')
+
+    def get_engine_voices(self, engine_name, selected_language):
+        """Returns the display names of an engine's voices for a language."""
+        voices = self.controller.output_manager.voice_catalog.get_voices(engine_name, selected_language)
+        self.voice_ids = {voice['Name']: voice['Id'] for voice in voices}
+        return [voice['Name'] for voice in voices]
 
     def get_audio_devices(self, input=False, output=False):
         """Returns a list of available audio devices."""
@@ -635,14 +802,18 @@ class UIManager:
                 device_names.add(name)
         return sorted(device_names)
 
+    def clear_output_queue(self):
+        """Handles the 'Clear Queue' button click."""
+        self.controller.clear_output_queue()
+
     def stop_audio(self):
         """Stops audio playback."""
         self.controller.stop_audio()
 
     def on_closing(self):
         """Handles actions when the window is closed."""
+        # mainloop() returns and the controller shuts the application down
         self.root.destroy()
-        sys.exit(0)
 
     def run(self):
         """Runs the main loop of the UI."""
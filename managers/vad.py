@@ -0,0 +1,133 @@
+# vad.py
+
+import collections
+import logging
+import math
+import numpy as np
+
+VadEvent = collections.namedtuple('VadEvent', ['kind', 'start', 'end'])
+
+SEGMENT_START = 'start'
+SEGMENT_END = 'end'
+
+class EnergyGate:
+    """Cheap RMS pre-gate that tracks the background noise floor.
+
+    Frames whose level is not at least `margin_db` above the adaptive noise
+    floor are treated as silence without running the (more expensive) VAD.
+    The floor follows quieter frames immediately and rises slowly towards
+    louder background frames, so it adapts to fans, hum and mic self-noise;
+    frames that pass the gate raise it far more slowly so speech does not
+    drag the floor up with it.
+    """
+
+    def __init__(self, margin_db=6.0, min_level_db=-65.0, rise_rate=0.01, initial_floor_db=-60.0):
+        self.margin_db = margin_db
+        self.min_level_db = min_level_db
+        self.rise_rate = rise_rate
+        self.floor_db = initial_floor_db
+        self.frames_seen = 0
+        self.frames_passed = 0
+
+    def level_db(self, frame):
+        """Returns the frame's RMS level in dBFS."""
+        samples = frame.astype(np.float32)
+        mean_square = float(np.dot(samples, samples)) / (len(samples) * 32768.0 * 32768.0)
+        return 10.0 * math.log10(mean_square + 1e-12)
+
+    def is_open(self, frame):
+        """Updates the noise floor with this frame and reports whether it may contain speech."""
+        level = self.level_db(frame)
+        self.frames_seen += 1
+        if level < self.floor_db:
+            self.floor_db = level
+            return False
+        if level < self.min_level_db or level < self.floor_db + self.margin_db:
+            self.floor_db += self.rise_rate * (level - self.floor_db)
+            return False
+        self.floor_db += self.rise_rate * 0.05 * (level - self.floor_db)
+        self.frames_passed += 1
+        return True
+
+    def pass_ratio(self):
+        return self.frames_passed / self.frames_seen if self.frames_seen else 0.0
+
+class VadSegmenter:
+    """Streaming voice activity segmenter with constant-time bookkeeping per frame.
+
+    Frames are fed one at a time. Positions are absolute sample offsets on the
+    segmenter's clock, so callers can cut the segment out of whatever buffer
+    holds the audio (a capture ring, a decoded file, a synthetic array).
+    """
+
+    def __init__(self, vad=None, sample_rate=16000, frame_duration=30, preroll_frames=10,
+                 hangover_frames=10, threshold=0.9, max_duration=10.0, aggressiveness=2, gate=None):
+        if vad is None:
+            import webrtcvad
+            vad = webrtcvad.Vad(aggressiveness)
+        self.vad = vad
+        self.gate = gate  # Optional EnergyGate; frames it rejects skip the VAD
+        self.sample_rate = sample_rate
+        self.frame_size = int(sample_rate * frame_duration / 1000)
+        self.preroll_frames = preroll_frames
+        self.hangover_frames = hangover_frames
+        self.threshold = threshold
+        self.max_samples = int(sample_rate * max_duration)
+        self.reset()
+
+    def reset(self, position=0):
+        """Drops any partial segment and restarts the sample clock at `position`."""
+        self.position = position
+        self.triggered = False
+        self.segment_start = None
+        self.window = collections.deque(maxlen=self.preroll_frames)
+        self.voiced_count = 0
+
+    def _push(self, is_speech, window_size):
+        """Appends a frame flag to the sliding window, keeping the voiced count up to date."""
+        if len(self.window) == window_size:
+            self.voiced_count -= self.window[0]
+        self.window.append(is_speech)
+        self.voiced_count += is_speech
+
+    def is_speech(self, frame):
+        if self.gate is not None and not self.gate.is_open(frame):
+            return False
+        return self.vad.is_speech(frame.tobytes(), self.sample_rate)
+
+    def feed(self, frame, is_speech=None):
+        """Feeds one frame and returns a VadEvent when a segment starts or ends, else None."""
+        if is_speech is None:
+            is_speech = self.is_speech(frame)
+        self.position += len(frame)
+
+        if not self.triggered:
+            self._push(is_speech, self.preroll_frames)
+            if self.voiced_count > self.threshold * self.preroll_frames:
+                self.triggered = True
+                # Pre-roll: the segment begins with the oldest frame still in the window
+                self.segment_start = self.position - len(self.window) * self.frame_size
+                self.window = collections.deque(maxlen=self.hangover_frames)
+                self.voiced_count = 0
+                return VadEvent(SEGMENT_START, self.segment_start, None)
+            return None
+
+        self._push(is_speech, self.hangover_frames)
+        unvoiced_count = len(self.window) - self.voiced_count
+        if unvoiced_count > self.threshold * self.hangover_frames:
+            return self._end_segment()
+        if self.position - self.segment_start >= self.max_samples:
+            logging.info("Max recording duration reached.")
+            return self._end_segment()
+        return None
+
+    def flush(self):
+        """Closes a segment that is still open at the end of the input, if any."""
+        if self.triggered:
+            return self._end_segment()
+        return None
+
+    def _end_segment(self):
+        event = VadEvent(SEGMENT_END, self.segment_start, self.position)
+        self.reset(self.position)
+        return event
@@ -0,0 +1,101 @@
+# voicecatalog.py
+
+import json
+import logging
+import os
+import threading
+import time
+
+class VoiceCatalog:
+    """Voice lists of every TTS engine, answered from memory and refreshed in the background.
+
+    Catalogs are persisted to a JSON file, so the settings window has voices
+    to show straight after startup without any network round trip. A catalog
+    older than `ttl` seconds is still served while refresh() fetches a new
+    one on a background thread; `on_update(engine_name)` is called from that
+    thread once it has been swapped in.
+    """
+
+    def __init__(self, list_voices, path='voice_catalog.json', ttl=7 * 24 * 3600, on_update=None):
+        self.list_voices = list_voices  # engine name -> [{'Name', 'Id', 'Locale'}, ...]; may block
+        self.path = path
+        self.ttl = ttl
+        self.on_update = on_update
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()  # Serializes writers of the catalog file
+        self.catalogs = {}  # engine name -> {'fetched': timestamp, 'voices': [...]}
+        self.indexes = {}  # engine name -> {locale: [voices sorted by name]}
+        self.refreshing = set()
+        self.load()
+
+    def load(self):
+        """Reads the persisted catalogs and indexes them."""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                catalogs = json.load(f)
+            for engine_name, catalog in catalogs.items():
+                self.set_catalog(engine_name, catalog['voices'], catalog['fetched'])
+            logging.info(f"Voice catalog: loaded {len(self.catalogs)} engines from {self.path}")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logging.error(f"Failed to load voice catalog: {e}")
+
+    def save(self):
+        """Writes all catalogs to disk, replacing the old file only once the new one is complete."""
+        with self.lock:
+            catalogs = dict(self.catalogs)
+        temp_path = f"{self.path}.tmp"
+        try:
+            with self.save_lock:
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump(catalogs, f)
+                os.replace(temp_path, self.path)
+        except Exception as e:
+            logging.error(f"Failed to save voice catalog: {e}")
+
+    def set_catalog(self, engine_name, voices, fetched):
+        index = {}
+        for voice in sorted(voices, key=lambda voice: voice['Name']):
+            index.setdefault(voice['Locale'], []).append(voice)
+        with self.lock:
+            self.catalogs[engine_name] = {'fetched': fetched, 'voices': voices}
+            self.indexes[engine_name] = index
+
+    def is_stale(self, engine_name):
+        catalog = self.catalogs.get(engine_name)
+        return catalog is None or time.time() - catalog['fetched'] > self.ttl
+
+    def refresh(self, engine_name, force=False):
+        """Fetches the engine's voices on a background thread if its catalog is missing or stale."""
+        with self.lock:
+            if engine_name in self.refreshing or not (force or self.is_stale(engine_name)):
+                return
+            self.refreshing.add(engine_name)
+        threading.Thread(target=self.refresh_worker, args=(engine_name,), daemon=True).start()
+
+    def refresh_worker(self, engine_name):
+        try:
+            voices = self.list_voices(engine_name)
+            self.set_catalog(engine_name, voices, time.time())
+            self.save()
+            logging.info(f"Voice catalog: {len(voices)} {engine_name} voices")
+        except Exception as e:
+            logging.error(f"Error getting {engine_name} voices: {e}")
+            return
+        finally:
+            with self.lock:
+                self.refreshing.discard(engine_name)
+        if self.on_update:
+            self.on_update(engine_name)
+
+    def get_locales(self, engine_name, prefix=''):
+        """Returns the sorted locales the engine has voices for, optionally only those starting with `prefix`."""
+        with self.lock:
+            locales = self.indexes.get(engine_name, {})
+        return sorted(locale for locale in locales if locale.startswith(prefix))
+
+    def get_voices(self, engine_name, locale):
+        """Returns the engine's voices for a locale, sorted by name."""
+        with self.lock:
+            return list(self.indexes.get(engine_name, {}).get(locale, ()))
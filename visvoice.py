@@ -1,13 +1,16 @@
 # visvoice.py
 
 import threading
-import time
 import logging
 import sys
 
 from managers.uimanager import UIManager
 from managers.inputmanager import InputManager
 from managers.outputmanager import OutputManager
+from managers.chatboxpacer import ChatboxPacer
+from managers.outputdispatcher import OutputDispatcher, PRIORITY_NORMAL, PRIORITY_URGENT
+from managers.textchunker import split_text
+from managers.transcriptionpipeline import TranscriptionPipeline
 
 class ApplicationController:
     def __init__(self):
@@ -21,133 +24,225 @@ class ApplicationController:
             # Initialize UIManager first to load settings
             self.ui_manager = UIManager(controller=self)
 
-            # Initialize InputManager and OutputManager with settings from UIManager
-            self.input_manager = InputManager()
+            # Initialize InputManager and OutputManager with settings from UIManager.
+            # The ASR model loads in the background; voice capture stays disabled until it is ready.
+            self.ui_manager.set_asr_state('loading')
+            self.input_manager = InputManager(
+                on_model_ready=self.on_asr_ready,
+                asr_backend=self.ui_manager.asr_backend,
+                asr_model=self.ui_manager.asr_model,
+                asr_workers=self.ui_manager.asr_workers,
+                decoding_profile=self.ui_manager.decoding_profile,
+                language=self.ui_manager.language,
+                max_pending_segments=4
+            )
             self.output_manager = OutputManager(
                 chatbox_ip=self.ui_manager.chatbox_ip,
                 chatbox_port=self.ui_manager.chatbox_port,
                 voice_engine=self.ui_manager.voice_engine,
-                voice=self.ui_manager.voice
+                voice=self.ui_manager.voice,
+                cache_memory_mb=self.ui_manager.tts_cache_memory_mb,
+                cache_disk_mb=self.ui_manager.tts_cache_disk_mb,
+                lookahead=self.ui_manager.tts_lookahead,
+                output_device=self.ui_manager.get_output_device_index(),
+                extra_osc_endpoints=self.ui_manager.get_extra_osc_endpoints()
             )
+            self.output_manager.voice_catalog.on_update = self.ui_manager.on_voice_catalog_update
 
             self.running = True
             self.voice_capture_active = False
             self.is_typing = False
+            # Set while capture is on and the user is not typing; capture threads block on it
+            self.capture_enabled = threading.Event()
+            # Set while capture is on; clearing it abandons an utterance in progress
+            self.capture_on = threading.Event()
+            # Set on shutdown; capture threads backing off after a device failure wait on it
+            self.stop_event = threading.Event()
 
             # For handling long texts
             self.max_chatbox_length = 144
 
-            # Start the voice input loop in a separate thread
-            threading.Thread(target=self.voice_input_loop, daemon=True).start()
+            # Chatbox chunks advance once the previous one has been read and spoken, within the rate limit
+            self.chatbox_pacer = ChatboxPacer(
+                chars_per_second=self.ui_manager.chatbox_reading_cps,
+                min_display=self.ui_manager.chatbox_min_display,
+                min_interval=self.ui_manager.chatbox_min_interval,
+                burst=self.ui_manager.chatbox_burst,
+                chatbox_enabled=lambda: self.ui_manager.output_options.get('Chatbox Output', False)
+            )
+
+            # One ordered queue of outgoing messages; chunks of different messages never interleave
+            self.output_dispatcher = OutputDispatcher(
+                speak=self.speak_chunk,
+                show=self.show_chunk,
+                cancel_output=self.output_manager.clear_speech,
+                max_pending=self.ui_manager.output_queue_size,
+                pacer=self.chatbox_pacer,
+                lookahead=self.ui_manager.tts_lookahead
+            )
+
+            # Capture hands finished utterances to a pool of transcription workers
+            self.transcription_pipeline = TranscriptionPipeline(
+                transcribe=self.input_manager.transcribe,
+                on_result=self.handle_transcription,
+                max_pending=self.input_manager.max_pending_segments,
+                workers=self.ui_manager.asr_workers
+            )
+
+            # Start one voice input loop per capture device; None is the primary (default) device
+            self.capture_devices = [(None, 'Primary')] + self.ui_manager.get_extra_input_devices()
+            for device, label in self.capture_devices:
+                threading.Thread(target=self.voice_input_loop, args=(device, label), daemon=True).start()
         
         except Exception as e:
             logging.critical(f"Failed to initialize application: {e}")
             sys.exit(1)
 
-    def voice_input_loop(self):
-        """Continuously listens for voice input if activated."""
+    def voice_input_loop(self, device=None, label='Primary'):
+        """Continuously captures utterances from one device if activated and queues them for transcription.
+
+        If the device fails to open or stops delivering audio, retries back off
+        from half a second up to half a minute until it captures again.
+        """
+        failures = 0
         while self.running:
-            if self.voice_capture_active and not self.is_typing:
-                text = self.input_manager.get_voice_input()
-                if text:
-                    # Insert transcribed text into the textbox via UIManager
-                    self.ui_manager.insert_text(text + ' ')
-                    logging.info(f'Transcribed text inserted into textbox: {text}')
+            # Block until voice capture is active and the user is not typing
+            self.capture_enabled.wait()
+            if not self.running:
+                break
+            # Only the primary device shows partial hypotheses in the textbox
+            if self.ui_manager.streaming_transcription and device is None:
+                segment = self.input_manager.capture_utterance(
+                    on_partial=self.ui_manager.set_partial_text,
+                    partial_interval=self.ui_manager.partial_interval_ms / 1000,
+                    active=self.capture_on
+                )
             else:
-                # If voice capture is not active or user is typing, sleep briefly
-                time.sleep(0.1)
-
-    def process_text(self, text):
-        """Processes the text: splits if necessary, outputs via TTS and chatbox."""
-        # Split text into chunks
-        chunks = self.split_text(text, self.max_chatbox_length)
-        # Start processing chunks in a separate thread
-        threading.Thread(target=self.output_chunks, args=(chunks,), daemon=True).start()
-
-    def split_text(self, text, max_length):
-        """Splits text into chunks not exceeding max_length characters."""
-        import re
-
-        sentence_endings = re.compile(r'(?<=[.!?])\s+')
-        sentences = sentence_endings.split(text)
-
-        chunks = []
-        current_chunk = ''
-
-        for sentence in sentences:
-            if len(current_chunk) + len(sentence) + 1 <= max_length:
-                current_chunk += (' ' + sentence) if current_chunk else sentence
+                segment = self.input_manager.capture_utterance(device=device, active=self.capture_on)
+            if segment is not None:
+                failures = 0
+                self.transcription_pipeline.submit(segment, source=label)
+            elif self.capture_on.is_set() and self.running:
+                # Capture is still on, so the device failed rather than being switched off
+                delay = min(30.0, 0.5 * 2 ** failures)
+                failures += 1
+                logging.warning(f"Capture from {label} failed; retrying in {delay:.1f}s")
+                self.stop_event.wait(delay)
+
+    def handle_transcription(self, text, source=None):
+        """Receives transcriptions from the pipeline workers, in capture order.
+
+        Only the primary device shows a partial hypothesis, so only its results
+        replace one; text from other devices is inserted ahead of it.
+        """
+        primary = source == self.capture_devices[0][1]
+        if text:
+            if primary:
+                # Replace the partial hypothesis with the final transcription via UIManager
+                self.ui_manager.commit_partial_text(text + ' ')
             else:
-                if current_chunk:
-                    chunks.append(current_chunk.strip())
-                if len(sentence) <= max_length:
-                    current_chunk = sentence
-                else:
-                    # Split long sentence into smaller chunks
-                    words = sentence.split()
-                    current_sentence_chunk = ''
-                    for word in words:
-                        if len(current_sentence_chunk) + len(word) + 1 <= max_length:
-                            current_sentence_chunk += (' ' + word) if current_sentence_chunk else word
-                        else:
-                            chunks.append(current_sentence_chunk.strip())
-                            current_sentence_chunk = word
-                    if current_sentence_chunk:
-                        current_chunk = current_sentence_chunk
-                    else:
-                        current_chunk = ''
-        if current_chunk:
-            chunks.append(current_chunk.strip())
-        return chunks
-
-    def output_chunks(self, chunks):
-        """Outputs text chunks via TTS and sends to chatbox."""
-        for chunk in chunks:
-            # Output via TTS if enabled
-            if self.ui_manager.output_options.get('Voice Output', False):
-                self.output_manager.speak_text(chunk)
-            # Send to chatbox if enabled
-            if self.ui_manager.output_options.get('Chatbox Output', False):
-                self.output_manager.send_to_chatbox(chunk)
-            # Wait before processing next chunk
-            time.sleep(10)
+                self.ui_manager.insert_text(text + ' ')
+            logging.info(f'Transcribed text from {source} inserted into textbox: {text}')
+        elif primary:
+            self.ui_manager.clear_partial_text()
+
+    def process_text(self, text, urgent=False):
+        """Splits the text into chunks and queues them for TTS and chatbox output.
+
+        Returns False if the output queue is full and the text was not accepted.
+        """
+        # Chunks are split as the dispatcher takes them, so the first one goes out right away
+        chunks = split_text(text, self.max_chatbox_length)
+        priority = PRIORITY_URGENT if urgent else PRIORITY_NORMAL
+        return self.output_dispatcher.submit(chunks, priority)
+
+    def speak_chunk(self, chunk):
+        """Queues one text chunk for TTS if voice output is on; called by the output dispatcher.
+
+        Returns an Event set when the chunk has been spoken, or None if voice output is off.
+        """
+        if self.ui_manager.output_options.get('Voice Output', False):
+            return self.output_manager.speak_text(chunk)
+        return None
+
+    def show_chunk(self, chunk):
+        """Sends one text chunk to the chatbox if chatbox output is on; called by the output dispatcher."""
+        if self.ui_manager.output_options.get('Chatbox Output', False):
+            self.output_manager.send_to_chatbox(chunk)
+
+    def on_asr_ready(self, success):
+        """Called from the model loader thread once the ASR model is usable (or failed)."""
+        self.ui_manager.set_asr_state('ready' if success else 'failed')
+
+    def reload_asr(self, asr_backend, asr_model):
+        """Swaps the ASR backend; capture is paused until the new model is ready."""
+        if self.voice_capture_active:
+            self.toggle_voice_capture()
+        self.ui_manager.set_asr_state('loading')
+        self.input_manager.load_model_async(asr_backend, asr_model)
 
     def toggle_voice_capture(self):
         """Toggles the voice capture on and off."""
+        if not self.input_manager.model_ready.is_set() and not self.voice_capture_active:
+            logging.info('Voice capture unavailable until the ASR model has loaded.')
+            return
         self.voice_capture_active = not self.voice_capture_active
         self.ui_manager.update_voice_capture_button(self.voice_capture_active)
+        if self.voice_capture_active:
+            self.input_manager.skip_to_live()
+        self.update_capture_enabled()
         if self.voice_capture_active:
             logging.info('Voice capture started.')
         else:
             logging.info('Voice capture stopped.')
 
     def stop_audio(self):
-        """Stops audio playback."""
-        self.output_manager.stop_audio()
+        """Stops the message being output, including its remaining chunks."""
+        if not self.output_dispatcher.cancel_current():
+            self.output_manager.stop_audio()
+
+    def clear_output_queue(self):
+        """Drops all messages waiting to be output."""
+        self.output_dispatcher.clear_queue()
 
     def set_typing(self, is_typing):
         """Sets the typing status."""
         self.is_typing = is_typing
+        self.update_capture_enabled()
 
-    def on_closing(self):
-        """Handles actions when the window is closed."""
+    def update_capture_enabled(self):
+        """Wakes or parks the capture threads to match the capture and typing state."""
+        if self.voice_capture_active:
+            self.capture_on.set()
+        else:
+            self.capture_on.clear()
+        if self.voice_capture_active and not self.is_typing:
+            self.capture_enabled.set()
+        else:
+            self.capture_enabled.clear()
+
+    def shutdown(self):
+        """Stops every component and logs their metrics; runs once the window has closed."""
+        self.running = False
+        self.stop_event.set()
+        self.capture_enabled.set()  # Release parked capture threads so they can exit
         try:
-            self.running = False
-            self.stop_audio()
-            # Ensure all threads are stopped
-            for thread in threading.enumerate():
-                if thread != threading.main_thread():
-                    thread.join(timeout=1.0)
-            sys.exit(0)
+            self.output_dispatcher.stop()
+            self.output_manager.close()
+            self.transcription_pipeline.stop()
+            self.input_manager.close()
         except Exception as e:
             logging.error(f"Error during shutdown: {e}")
-            sys.exit(1)
+        logging.info(f"Transcription pipeline metrics: {self.transcription_pipeline.get_metrics()}")
+        logging.info(f"Output dispatcher metrics: {self.output_dispatcher.get_metrics()}")
+        logging.info(f"OSC send stats: {self.output_manager.osc_sender.get_stats()}")
+        logging.info(f"TTS cache stats: {self.output_manager.tts_cache.get_stats()}")
+        logging.info(f"Playback stats: {self.output_manager.get_playback_stats()}")
 
     def run(self):
         """Runs the main application."""
         self.ui_manager.run()
-        self.running = False
-        self.output_manager.stop_audio()
+        self.shutdown()
 
 def main():
     app_controller = ApplicationController()
@@ -0,0 +1,49 @@
+# visvoice_batch.py
+#
+# Headless batch transcription of recorded sessions. Runs without tkinter or
+# sounddevice, e.g.:
+#   python visvoice_batch.py recordings/ --workers 4 --output transcripts.jsonl
+
+import argparse
+import logging
+import sys
+
+from managers.asrbackends import ASR_BACKENDS, DECODING_PROFILES, MODEL_SIZES
+from managers.batchtranscriber import find_audio_files, transcribe_files
+
+def main():
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+    parser = argparse.ArgumentParser(description="Transcribe WAV/FLAC files to JSONL.")
+    parser.add_argument('paths', nargs='+', help="Audio files or directories containing them")
+    parser.add_argument('--output', '-o', help="JSONL output file (default: stdout)")
+    parser.add_argument('--workers', '-w', type=int, default=2, help="Number of worker processes")
+    parser.add_argument('--backend', default='whisper', choices=list(ASR_BACKENDS))
+    parser.add_argument('--model', default='base', choices=MODEL_SIZES)
+    parser.add_argument('--profile', default='balanced', choices=list(DECODING_PROFILES))
+    parser.add_argument('--language', help="Locale to pin decoding to, e.g. en-US (default: auto-detect)")
+    args = parser.parse_args()
+
+    files = find_audio_files(args.paths)
+    if not files:
+        logging.error("No WAV or FLAC files found.")
+        sys.exit(1)
+
+    output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        transcribe_files(
+            files, output,
+            workers=max(1, args.workers),
+            asr_backend=args.backend,
+            asr_model=args.model,
+            decoding_profile=args.profile,
+            language=args.language
+        )
+    finally:
+        if args.output:
+            output.close()
+
+if __name__ == "__main__":
+    main()